@@ -1,10 +1,8 @@
 import os
+import sys
 import time
+import functools
 import streamlit as st
-from datetime import datetime
-from recorder import Recorder
-from transcriptor import Transcriptor
-from painter import StableDiffusionPainter as Painter
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -20,14 +18,20 @@ st.set_page_config(
 # Initialize session state
 if "audio_file" not in st.session_state:
     st.session_state.audio_file = None
+if "uploaded_audio" not in st.session_state:
+    st.session_state.uploaded_audio = (None, None)  # (file_id, saved path) of the last ingested upload
+if "audio_take" not in st.session_state:
+    st.session_state.audio_take = None  # RecordingHandle of the last microphone take, transcribed from memory
 if "transcript" not in st.session_state:
     st.session_state.transcript = None
+if "transcript_path" not in st.session_state:
+    st.session_state.transcript_path = None  # Saved transcript file, linked to the next history entry
 if "image_path" not in st.session_state:
     st.session_state.image_path = None
-if "recorder" not in st.session_state:
-    st.session_state.recorder = Recorder()
-if "history" not in st.session_state:
-    st.session_state.history = []
+if "image_is_draft" not in st.session_state:
+    st.session_state.image_is_draft = False  # image_path is a draft being refined in the background
+if "history_cursors" not in st.session_state:
+    st.session_state.history_cursors = [None]  # Keyset cursor of every gallery page visited so far
 if 'is_recording' not in st.session_state:
     st.session_state.is_recording = False
 if 'recording_start_time' not in st.session_state:
@@ -40,11 +44,62 @@ if 'stability_api_key' not in st.session_state:
     st.session_state.stability_api_key = os.getenv("STABILITY_API_KEY", "")
 if 'recording_time' not in st.session_state:
     st.session_state.recording_time = 5  # Default recording time in seconds
+if 'transcribe_job' not in st.session_state:
+    st.session_state.transcribe_job = None
+if 'paint_job' not in st.session_state:
+    st.session_state.paint_job = None
+if 'job_error' not in st.session_state:
+    st.session_state.job_error = None
 
-# Create necessary directories
-os.makedirs("recordings", exist_ok=True)
-os.makedirs("transcripts", exist_ok=True)
-os.makedirs("images", exist_ok=True)
+# Services are shared by every session and their modules are only imported on first use
+@st.cache_resource(show_spinner=False)
+def get_recorder():
+    from recorder import Recorder
+    return Recorder()
+
+@st.cache_resource(show_spinner=False)
+def get_transcriptor():
+    from transcriptor import Transcriptor
+    return Transcriptor()
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_painter(api_key):
+    from painter import StableDiffusionPainter
+    return StableDiffusionPainter(api_key=api_key)
+
+@st.cache_resource(show_spinner=False)
+def get_history():
+    from history import HistoryStore
+    history = HistoryStore()
+    history.index_transcripts("transcripts")
+    return history
+
+@st.cache_resource(show_spinner=False)
+def get_job_manager():
+    from jobs import JobManager
+    return JobManager(transcriptor=get_transcriptor())
+
+# Create the artifact stores and keep them within their budgets in the background
+@st.cache_resource(show_spinner=False)
+def start_storage_janitor():
+    import storage
+    for directory in ("recordings", "transcripts", "images"):
+        storage.get_store(directory)
+    return storage.start_janitor()
+
+start_storage_janitor()
+
+# Optional latency metrics: VOICEDRAW_METRICS_PORT=9100 serves /metrics and /metrics.json
+@st.cache_resource(show_spinner=False)
+def start_metrics_server(port):
+    import metrics
+    metrics.enable()
+    server, url = metrics.serve(port=port)
+    print(f"Ölçümler: {url}/metrics")
+    return server
+
+if os.getenv("VOICEDRAW_METRICS_PORT"):
+    start_metrics_server(int(os.environ["VOICEDRAW_METRICS_PORT"]))
 
 # Title and description
 st.title("🎨 VoiceDraw")
@@ -77,6 +132,88 @@ def recording_complete(audio_file):
     st.session_state.audio_file = audio_file
     st.session_state.elapsed_time = 0
 
+# Number of history entries rendered per gallery page
+HISTORY_PAGE_SIZE = 5
+
+# Shown when another session holds the shared recorder
+MICROPHONE_BUSY_MESSAGE = "Mikrofon şu anda başka bir oturumda kullanılıyor, lütfen biraz sonra tekrar deneyin."
+
+# Gallery thumbnails live in the images store, so the janitor may delete them
+THUMBNAIL_DIRECTORY = os.path.join("images", "thumbnails")
+
+@st.cache_data(show_spinner=False, max_entries=1024)
+def get_thumbnail(image_path, modified_time):
+    # modified_time is part of the cache key so a replaced file gets a new thumbnail
+    from painter import create_thumbnail
+    return create_thumbnail(image_path, directory=THUMBNAIL_DIRECTORY)
+
+def thumbnail_for(image_path):
+    thumbnail = get_thumbnail(image_path, os.path.getmtime(image_path))
+    if not os.path.exists(thumbnail):
+        # The storage janitor swept the cached thumbnail; it is recreated under the same path
+        from painter import create_thumbnail
+        thumbnail = create_thumbnail(image_path, directory=THUMBNAIL_DIRECTORY)
+    return thumbnail
+
+def read_file_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+# Poll background jobs without blocking the script; a finished job triggers a full rerun
+@st.fragment(run_every=1.0)
+def show_transcription_job():
+    job = get_job_manager().get(st.session_state.transcribe_job)
+    if job and job["status"] not in ("done", "failed"):
+        st.info("⏳ Ses metne dönüştürülüyor...")
+        return
+    
+    st.session_state.transcribe_job = None
+    if job and job["status"] == "done":
+        st.session_state.transcript = job["stages"]["transcribe"]["result"]["text"]
+        st.session_state.transcript_path = job["stages"]["transcribe"]["result"]["transcript_path"]
+    else:
+        st.session_state.job_error = "Ses tanıma başarısız oldu. Lütfen farklı bir ses dosyası deneyin."
+    st.rerun()
+
+@st.fragment(run_every=1.0)
+def show_paint_job():
+    job = get_job_manager().get(st.session_state.paint_job)
+    draft = job["stages"].get("draft", {}) if job else {}
+    draft_path = (draft.get("result") or {}).get("image_path")
+    if job and job["status"] not in ("done", "failed", "cancelled"):
+        if draft_path and draft_path != st.session_state.image_path:
+            # Show the draft right away; the final image replaces it when it's ready
+            st.session_state.image_path = draft_path
+            st.session_state.image_is_draft = True
+            st.rerun()
+        if draft_path:
+            st.info("⏳ Taslak hazır, son görüntü oluşturuluyor...")
+        else:
+            st.info("⏳ Görüntü oluşturuluyor (Bu işlem biraz zaman alabilir)...")
+        return
+    
+    st.session_state.paint_job = None
+    if job and job["status"] == "done":
+        image_path = job["stages"]["paint"]["result"]["image_path"]
+        st.session_state.image_path = image_path
+        st.session_state.image_is_draft = False
+        
+        # Add to the persistent history; linking the transcript file keeps
+        # index_transcripts() from adding it again as an entry without an image.
+        # A file can only be linked once, so later images of the same text aren't linked
+        get_history().add(
+            job["params"]["prompt"],
+            image_path=image_path,
+            audio_path=st.session_state.audio_file,
+            transcript_path=st.session_state.transcript_path
+        )
+        st.session_state.transcript_path = None
+    elif draft_path:
+        st.session_state.job_error = "Son görüntü oluşturulamadı, taslak gösteriliyor."
+    else:
+        st.session_state.job_error = "Görüntü oluşturulamadı. API anahtarınızı kontrol edin."
+    st.rerun()
+
 # Main app interface
 col1, col2 = st.columns([1, 1])
 
@@ -96,17 +233,35 @@ with col1:
     
     # File upload method
     if st.session_state.input_method == "upload":
-        uploaded_file = st.file_uploader("Ses dosyası seç (WAV formatı)", type=["wav"])
+        # Release the microphone while it isn't needed (unless another session is using it);
+        # if the recorder module was never imported there is nothing to release
+        if "recorder" in sys.modules and not get_recorder().is_recording():
+            get_recorder().stop_listening()
+        
+        uploaded_file = st.file_uploader("Ses dosyası seç (WAV, FLAC, OGG veya MP3)", type=["wav", "flac", "ogg", "mp3"])
         
         if uploaded_file is not None:
-            st.session_state.audio_file = st.session_state.recorder.save_uploaded_audio(uploaded_file)
-            st.success(f"Ses dosyası başarıyla yüklendi: {os.path.basename(st.session_state.audio_file)}")
+            # Uploads are converted to 16 kHz mono FLAC and trimmed like microphone takes,
+            # once per file: every rerun while the file stays in the uploader reuses the result
+            file_id, audio_path = st.session_state.uploaded_audio
+            if file_id != uploaded_file.file_id or not (audio_path and os.path.exists(audio_path)):
+                audio_path = get_recorder().save_uploaded_audio(uploaded_file, trim=True)
+                st.session_state.uploaded_audio = (uploaded_file.file_id, audio_path)
+            st.session_state.audio_file = audio_path
+            st.session_state.audio_take = None
+            if audio_path:
+                st.success(f"Ses dosyası başarıyla yüklendi: {os.path.basename(audio_path)}")
+            else:
+                st.error("Ses dosyası okunamadı")
     
     # Microphone recording method
     else:
+        # Keep the input stream open so takes start instantly and include pre-roll
+        get_recorder().start_listening()
+        
         # Add recording duration slider
         recording_time = st.slider(
-            "Kayıt süresi (saniye):", 
+            "Maksimum kayıt süresi (saniye):", 
             min_value=3, 
             max_value=30, 
             value=st.session_state.recording_time,
@@ -117,9 +272,15 @@ with col1:
         if recording_time != st.session_state.recording_time:
             st.session_state.recording_time = recording_time
         
+        live_transcription = st.checkbox("Konuşurken metne dönüştür (canlı)", value=False)
+        
         # Display recording controls
         if not st.session_state.is_recording:
-            if st.button("🎙️ Kayıt Başlat"):
+            start_clicked = st.button("🎙️ Kayıt Başlat")
+            if start_clicked and get_recorder().is_recording():
+                # The microphone is shared by every session and another one is recording
+                st.warning(MICROPHONE_BUSY_MESSAGE)
+            elif start_clicked:
                 start_recording()
                 
                 # Create a progress bar placeholder
@@ -129,33 +290,47 @@ with col1:
                 # Get the recording duration from session state
                 duration = st.session_state.recording_time
                 
-                # Start the recording in a non-blocking way
-                st.session_state.recorder.start_recording()
-                
-                # Show progress
-                for i in range(duration):
-                    # Update progress bar
-                    progress_bar.progress((i + 1) / duration)
-                    status_text.text(f"Kayıt yapılıyor... {i + 1}/{duration} saniye")
-                    time.sleep(1)
-                
-                # Stop recording after the duration
-                audio_file = st.session_state.recorder.stop_recording()
-                
-                # Wait a moment for the file to be saved (the callback in recorder will handle this)
-                time.sleep(1.5)
-                
-                # Find the latest recording
-                recordings_dir = "recordings"
-                if os.path.exists(recordings_dir):
-                    files = [os.path.join(recordings_dir, f) for f in os.listdir(recordings_dir) 
-                             if f.startswith("mic_") and f.endswith(".wav")]
-                    if files:
-                        # Sort by modification time (newest first)
-                        latest_file = max(files, key=os.path.getmtime)
-                        st.session_state.audio_file = latest_file
-                        status_text.text(f"Ses kaydı tamamlandı: {os.path.basename(latest_file)}")
+                if live_transcription:
+                    # Recognize each phrase while the take is still being captured
+                    saved = {}
+                    status_text.text("Kayıt yapılıyor, konuşma canlı metne dönüştürülüyor...")
+                    live_text = st.empty()
+                    transcriptor = get_transcriptor()
+                    for partial in transcriptor.transcribe_stream(
+                        get_recorder(),
+                        language="en",
+                        max_duration=duration,
+                        silence_ms=1000,
+                        callback=lambda path: saved.update(path=path)
+                    ):
+                        live_text.markdown(f"📝 {partial}")
+                        st.session_state.transcript = partial
+                    progress_bar.progress(1.0)
+                    
+                    st.session_state.audio_file = saved.get("path")
+                    st.session_state.audio_take = None
+                    if st.session_state.transcript:
+                        st.session_state.transcript_path = transcriptor.save_transcript(st.session_state.transcript)
+                else:
+                    # The take ends on its own after a pause or when the duration runs out
+                    handle = get_recorder().start_recording(silence_ms=1000, max_duration=duration)
+                    
+                    # Show progress until the take is in memory; its file is finished in the background
+                    while handle and handle.audio(timeout=0.1) is None and not handle.done():
+                        progress_bar.progress(handle.progress() or 0.0)
+                        status_text.text(f"Kayıt yapılıyor... {int(handle.elapsed())}/{duration} saniye")
+                    progress_bar.progress(1.0)
+                    
+                    samples = handle.audio(timeout=5) if handle else None
+                    if not handle:
+                        st.session_state.audio_take = None
+                        status_text.text(MICROPHONE_BUSY_MESSAGE)
+                    elif samples is not None:
+                        st.session_state.audio_take = handle
+                        st.session_state.audio_file = handle.path
+                        status_text.text(f"Ses kaydı tamamlandı ({len(samples) / handle.sample_rate:.1f} saniye)")
                     else:
+                        st.session_state.audio_take = None
                         status_text.text("Kayıt dosyası bulunamadı!")
                 
                 # Reset recording state
@@ -177,40 +352,49 @@ with col1:
             
             # Stop button
             if st.button("⏹️ Kayıt Durdur"):
-                st.session_state.recorder.stop_recording()
+                get_recorder().stop_recording()
                 stop_recording()
                 st.rerun()
     
+    # A take's file may have been finalized since the take ended
+    take = st.session_state.audio_take
+    if take is not None and take.path:
+        st.session_state.audio_file = take.path
+    take_samples = take.audio(timeout=0) if take is not None else None
+    
     # Display audio and transcribe button if audio is available
-    if st.session_state.audio_file and os.path.exists(st.session_state.audio_file):
-        st.audio(st.session_state.audio_file)
+    if take_samples is not None or (st.session_state.audio_file and os.path.exists(st.session_state.audio_file)):
+        if take_samples is not None:
+            st.audio(take_samples, sample_rate=take.sample_rate)
+        else:
+            st.audio(st.session_state.audio_file)
         
-        if st.button("🔄 Metne Dönüştür"):
-            with st.spinner("Ses metne dönüştürülüyor..."):
-                try:
-                    # Initialize transcriptor
-                    transcriptor = Transcriptor()
-                    
-                    # Transcribe audio to text
-                    st.session_state.transcript = transcriptor.transcribe(st.session_state.audio_file, language="en")
-                    
-                    if st.session_state.transcript:
-                        # Save transcript to file
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        transcript_file = f"transcripts/transcript_{timestamp}.txt"
-                        transcriptor.save_transcript(st.session_state.transcript, transcript_file)
-                    else:
-                        st.error("Ses tanıma başarısız oldu. Lütfen farklı bir ses dosyası deneyin.")
-                    
-                except Exception as e:
-                    st.error(f"Transkripsiyon hatası: {str(e)}")
+        if st.session_state.transcribe_job:
+            show_transcription_job()
+        elif st.button("🔄 Metne Dönüştür"):
+            # Runs in the background; the transcript is also saved to transcripts/.
+            # Microphone takes are transcribed from memory instead of being read back from disk
+            st.session_state.transcribe_job = get_job_manager().submit_transcription(
+                st.session_state.audio_file, language="en",
+                audio=take_samples, sample_rate=take.sample_rate if take is not None else None
+            )
             st.rerun()
+    
+    if st.session_state.job_error:
+        st.error(st.session_state.job_error)
+        st.session_state.job_error = None
 
     # Display transcript if available
     st.subheader("2️⃣ Konuşma Metni")
     
     if st.session_state.transcript:
         st.success("✅ Ses metne dönüştürüldü!")
+        if st.session_state.audio_file or st.session_state.audio_take:
+            cache_stats = get_transcriptor().cache.stats()
+            st.caption(
+                f"Transkript önbelleği: {cache_stats['memory_hits'] + cache_stats['disk_hits']} isabet, "
+                f"{cache_stats['misses']} ıskalama"
+            )
         
         # Display the transcript in a text area that can be edited
         edited_transcript = st.text_area("Metni düzenleyebilirsiniz:", st.session_state.transcript, height=150)
@@ -218,6 +402,13 @@ with col1:
         # Update transcript if edited
         if edited_transcript != st.session_state.transcript:
             st.session_state.transcript = edited_transcript
+            # An image for the old text is no longer wanted: stop it before it uses more quota
+            if st.session_state.paint_job:
+                get_job_manager().cancel(st.session_state.paint_job)
+                st.session_state.paint_job = None
+                if st.session_state.image_is_draft:
+                    st.session_state.image_path = None
+                    st.session_state.image_is_draft = False
         
         # API Key alanı
         api_key = st.text_input(
@@ -232,35 +423,26 @@ with col1:
             os.environ["STABILITY_API_KEY"] = api_key
             st.success("API anahtarı güncellendi!")
         
+        fresh_sample = st.checkbox("Yeni örnek üret (önbelleği atla)", value=False)
+        
         # Generate image button
-        if st.button("🖼️ Görüntü Oluştur"):
-            if not st.session_state.stability_api_key:
+        if st.session_state.paint_job:
+            show_paint_job()
+        elif st.button("🖼️ Görüntü Oluştur"):
+            # PAINTER_BACKEND=local generates on this machine and needs no API key
+            if not st.session_state.stability_api_key and os.getenv("PAINTER_BACKEND", "stability") == "stability":
                 st.error("Görüntü oluşturmak için bir Stability AI API anahtarı gerekiyor.")
             else:
-                with st.spinner("Görüntü oluşturuluyor (Bu işlem biraz zaman alabilir)..."):
-                    try:
-                        painter = Painter()
-                        # Optimize edilmiş boyut
-                        image_path = painter.paint(
-                            prompt=edited_transcript, 
-                            width=1024, 
-                            height=1024, 
-                            steps=30
-                        )
-                        
-                        if image_path and os.path.exists(image_path):
-                            st.session_state.image_path = image_path
-                            
-                            # Add to history
-                            st.session_state.history.append({
-                                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                "transcript": edited_transcript,
-                                "image_path": image_path
-                            })
-                        else:
-                            st.error("Görüntü oluşturulamadı. API anahtarınızı kontrol edin.")
-                    except Exception as e:
-                        st.error(f"Görüntü oluşturma hatası: {str(e)}")
+                # Runs in the background so reruns don't cancel it; a quick draft with the
+                # same seed is shown first and replaced by the final image
+                st.session_state.paint_job = get_job_manager().submit_progressive(
+                    get_painter(st.session_state.stability_api_key),
+                    prompt=edited_transcript, 
+                    width=1024, 
+                    height=1024, 
+                    steps=30,
+                    use_cache=not fresh_sample
+                )
                 st.rerun()
     else:
         st.info("Henüz bir ses kaydı transkript edilmedi veya metin girilmedi.")
@@ -268,6 +450,7 @@ with col1:
         direct_text = st.text_area("İsterseniz doğrudan metin girebilirsiniz:", height=150)
         if direct_text.strip() and st.button("Bu Metinden Görüntü Oluştur"):
             st.session_state.transcript = direct_text
+            st.session_state.transcript_path = None
             st.rerun()
 
 with col2:
@@ -275,23 +458,32 @@ with col2:
     st.subheader("3️⃣ Oluşturulan Görüntü")
     
     if st.session_state.image_path and os.path.exists(st.session_state.image_path):
-        st.success("✅ Görüntü başarıyla oluşturuldu!")
-        st.image(st.session_state.image_path, caption="Oluşturulan görüntü")
+        if st.session_state.image_is_draft:
+            st.info("🖌️ Taslak görüntü; son hali hazırlanıyor...")
+            st.image(st.session_state.image_path, caption="Taslak görüntü")
+        else:
+            st.success("✅ Görüntü başarıyla oluşturuldu!")
+            st.image(st.session_state.image_path, caption="Oluşturulan görüntü")
         
-        # Download button
-        with open(st.session_state.image_path, "rb") as file:
-            btn = st.download_button(
-                label="📥 Görüntüyü İndir",
-                data=file,
-                file_name=os.path.basename(st.session_state.image_path),
-                mime="image/png"
-            )
+        # Download button; the file is only read when the user clicks it
+        btn = st.download_button(
+            label="📥 Görüntüyü İndir",
+            data=functools.partial(read_file_bytes, st.session_state.image_path),
+            file_name=os.path.basename(st.session_state.image_path),
+            mime="image/png"
+        )
         
         # New recording button
         if st.button("🔄 Yeni Kayıt"):
+            if st.session_state.paint_job:
+                get_job_manager().cancel(st.session_state.paint_job)
+                st.session_state.paint_job = None
             st.session_state.audio_file = None
+            st.session_state.audio_take = None
             st.session_state.transcript = None
+            st.session_state.transcript_path = None
             st.session_state.image_path = None
+            st.session_state.image_is_draft = False
             st.rerun()
     else:
         st.info("Görüntü oluşturmak için önce ses kaydı yükleyin veya metne dönüştürün.")
@@ -312,29 +504,55 @@ with col2:
         """)
 
 # Show history in expandable section
+def reset_history_page():
+    st.session_state.history_cursors = [None]
+
 with st.expander("📋 Geçmiş Oluşturmalar"):
-    if not st.session_state.history:
-        st.info("Henüz bir görsel oluşturulmadı.")
-    else:
-        # Display history in reverse order (newest first)
-        for idx, item in enumerate(reversed(st.session_state.history)):
-            st.write(f"**{item['timestamp']}**")
-            cols = st.columns(2)
-            with cols[0]:
-                st.write(f"{item['transcript']}")
-            with cols[1]:
-                st.image(item['image_path'], caption=f"Görsel #{len(st.session_state.history)-idx}")
+    history = get_history()
+    search = st.text_input("Metinlerde ara", key="history_search", on_change=reset_history_page)
+    
+    # Only the current page is read from the database
+    cursors = st.session_state.history_cursors
+    entries, next_cursor = history.page(before=cursors[-1], limit=HISTORY_PAGE_SIZE, query=search)
+    
+    if not entries:
+        st.info("Aramanızla eşleşen kayıt bulunamadı." if search else "Henüz bir görsel oluşturulmadı.")
+    
+    for item in entries:
+        st.write(f"**{item['created']}**")
+        cols = st.columns(2)
+        with cols[0]:
+            st.write(f"{item['transcript']}")
+        with cols[1]:
+            if not item['image_path']:
+                st.caption("Bu metin için görsel yok.")
+            elif os.path.exists(item['image_path']):
+                thumbnail = thumbnail_for(item['image_path'])
+                st.image(thumbnail, caption=f"Görsel #{item['id']}")
                 
-                # Download button for the historical image
-                with open(item['image_path'], "rb") as file:
-                    st.download_button(
-                        label="📥 İndir",
-                        data=file,
-                        file_name=os.path.basename(item['image_path']),
-                        mime="image/png",
-                        key=f"download_{idx}"
-                    )
-            st.markdown("---")
+                # Download button for the historical image, loaded only on click
+                st.download_button(
+                    label="📥 İndir",
+                    data=functools.partial(read_file_bytes, item['image_path']),
+                    file_name=os.path.basename(item['image_path']),
+                    mime="image/png",
+                    key=f"download_{item['id']}"
+                )
+            else:
+                st.warning("Görsel dosyası artık mevcut değil.")
+        st.markdown("---")
+    
+    nav = st.columns([1, 2, 1])
+    with nav[0]:
+        if len(cursors) > 1 and st.button("⬅️ Daha yeni"):
+            cursors.pop()
+            st.rerun()
+    with nav[1]:
+        st.caption(f"Sayfa {len(cursors)} · {history.count(search)} kayıt")
+    with nav[2]:
+        if next_cursor is not None and st.button("Daha eski ➡️"):
+            cursors.append(next_cursor)
+            st.rerun()
 
 # Footer
 st.markdown("---")
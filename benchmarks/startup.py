@@ -0,0 +1,148 @@
+"""
+Startup benchmark for VoiceDraw
+
+Measures, each in a fresh interpreter:
+  - cold import time of every module
+  - time to a finished first script run of app.py (first paint)
+  - time of module entry points that don't touch devices or the network
+
+Usage:
+    python benchmarks/startup.py --repeat 5 --output startup.json
+    python benchmarks/startup.py --baseline startup.json --tolerance 0.25
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["recorder", "transcriptor", "painter"]
+
+# Module entry points with arguments that exercise startup without devices or network I/O
+ENTRY_POINTS = {
+    "transcriptor": ["--help"],
+}
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+ENTRY_SNIPPET = """
+import sys, time, runpy
+started = time.perf_counter()
+sys.argv = [{path!r}] + {args!r}
+try:
+    runpy.run_path({path!r}, run_name="__main__")
+except SystemExit:
+    pass
+print(time.perf_counter() - started, file=sys.stderr)
+"""
+
+APP_SNIPPET = """
+import time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({path!r}, default_timeout=60)
+app.run()
+if app.exception:
+    raise SystemExit(str(app.exception))
+print(time.perf_counter() - started)
+"""
+
+def _run(snippet, from_stderr=False):
+    """
+    Run a snippet in a fresh interpreter and return the seconds it reports
+    """
+    # Start in a scratch directory, so the runs leave no history.db, jobs/ or images/ in the repo
+    workdir = tempfile.mkdtemp(prefix="voicedraw_startup_")
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", snippet],
+            cwd=workdir,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.getenv("PYTHONPATH")]))},
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    output = result.stderr if from_stderr else result.stdout
+    if result.returncode != 0:
+        raise RuntimeError((result.stderr or result.stdout).strip().splitlines()[-1])
+    return float(output.strip().splitlines()[-1])
+
+def _measure(snippet, repeat, from_stderr=False):
+    samples = []
+    for _ in range(repeat):
+        try:
+            samples.append(_run(snippet, from_stderr))
+        except Exception as e:
+            return {"error": str(e)}
+    return {"median": statistics.median(samples), "min": min(samples), "max": max(samples)}
+
+def run_benchmarks(repeat=5):
+    """
+    Run every startup measurement
+
+    Returns:
+        dict: Measurement name -> {"median", "min", "max"} in seconds, or {"error"}
+    """
+    results = {}
+    for module in MODULES:
+        results[f"import:{module}"] = _measure(IMPORT_SNIPPET.format(module=module), repeat)
+    for module, args in ENTRY_POINTS.items():
+        path = os.path.join(ROOT, f"{module}.py")
+        results[f"main:{module}"] = _measure(ENTRY_SNIPPET.format(path=path, args=args), repeat, from_stderr=True)
+    results["app:first_run"] = _measure(APP_SNIPPET.format(path=os.path.join(ROOT, "app.py")), repeat)
+    return results
+
+def compare(results, baseline, tolerance):
+    """
+    Compare medians against a baseline
+
+    Returns:
+        list: Names of measurements slower than baseline * (1 + tolerance)
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name, {})
+        if "median" in result and "median" in before and result["median"] > before["median"] * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VoiceDraw startup benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.repeat)
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<24} hata: {result['error']}")
+        else:
+            print(f"{name:<24} {result['median'] * 1000:8.1f} ms (min {result['min'] * 1000:.1f}, max {result['max'] * 1000:.1f})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Yavaşlama / Regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+Offline throughput and latency benchmark for the voice -> text -> image pipeline
+
+Every stage runs in a fresh interpreter (so peak RSS is per stage) against
+local stub servers with configurable latency; no network, microphone or GPU
+is needed:
+  - record:      Recorder's take writer (silence trim + FLAC write) for synthetic takes
+  - transcribe:  Transcriptor with the stub recognizer over HTTP
+  - paint:       StableDiffusionPainter against the stub text-to-image endpoint
+  - end_to_end:  all three stages for every item
+
+Usage:
+    python benchmarks/throughput.py --items 20 --seconds 5 --output throughput.json
+    python benchmarks/throughput.py --baseline throughput.json --tolerance 0.25
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ["record", "transcribe", "paint", "end_to_end"]
+
+SAMPLE_RATE = 16000
+# Frames per block when feeding the recorder, like a 100 ms audio callback
+CALLBACK_FRAMES = 1600
+
+def synthetic_speech(seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """
+    Generate speech-like audio: voiced syllables, fricatives and pauses over a noise floor
+
+    Syllables are harmonic series (f0 90-220 Hz) under a smooth envelope, so the
+    voice activity detector and FLAC encoder see something close to real speech.
+
+    Returns:
+        np.ndarray: float32 mono samples in [-1, 1]
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    audio = rng.normal(0.0, 0.001, total).astype(np.float32)
+    position = int(rng.uniform(0.2, 0.5) * sample_rate)
+    while position < total:
+        length = int(rng.uniform(0.12, 0.3) * sample_rate)
+        t = np.arange(length) / sample_rate
+        f0 = rng.uniform(90, 220) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+        phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+        if rng.random() < 0.3:
+            voiced = voiced + rng.normal(0, 0.5, length)  # fricative
+        syllable = (0.2 * voiced * np.hanning(length)).astype(np.float32)
+        end = min(total, position + length)
+        audio[position:end] += syllable[:end - position]
+        position = end + int(rng.choice([0.05, 0.08, 0.4]) * sample_rate)
+    return np.clip(audio, -1.0, 1.0)
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def _summarize(latencies, wall, errors):
+    values = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "items": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 4),
+        "throughput": round(len(latencies) / wall, 3) if wall else 0.0,
+        "p50": round(float(np.percentile(values, 50)), 5),
+        "p95": round(float(np.percentile(values, 95)), 5),
+        "p99": round(float(np.percentile(values, 99)), 5),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+def run_stage(stage, args):
+    """
+    Run one stage in this process (called in the child interpreter)
+
+    Returns:
+        dict: Throughput, latency percentiles (seconds) and peak RSS (MB)
+    """
+    # The benchmark measures the pipeline, not the production API quota
+    os.environ["STABILITY_RATE_LIMIT"] = "1000000"
+    from recorder import Recorder, RecordingHandle
+    from transcriptor import Transcriptor
+    from painter import StableDiffusionPainter
+
+    recorder = Recorder(output_directory="recordings")
+    transcriptor = Transcriptor(backend="stub", url=args.recognizer_url, cache=False)
+    painter = StableDiffusionPainter(
+        api_key="benchmark", api_host=args.stability_url, cache_max_bytes=0, pool_size=max(10, args.workers)
+    )
+    audio = [synthetic_speech(args.seconds, seed=args.seed + i).reshape(-1, 1) for i in range(args.items)]
+
+    def save(samples):
+        # Feed the take the way the audio callback does, then time until the file is final
+        handle = RecordingHandle(SAMPLE_RATE)
+        writer = recorder._open_take(handle)
+        for start in range(0, len(samples), CALLBACK_FRAMES):
+            writer.put(samples[start:start + CALLBACK_FRAMES])
+        writer.close()
+        return handle.wait()
+
+    def paint(prompt):
+        return painter.paint(prompt, width=args.size, height=args.size, steps=args.steps, use_cache=False)
+
+    if stage == "record":
+        items, work = audio, save
+    elif stage == "transcribe":
+        items, work = [save(samples) for samples in audio], lambda path: transcriptor.transcribe(path, "en")
+    elif stage == "paint":
+        items, work = [f"benchmark prompt {i}" for i in range(args.items)], paint
+    else:
+        def work(samples):
+            text = transcriptor.transcribe(save(samples), "en")
+            return paint(text) if text else None
+        items = audio
+
+    def timed(item):
+        started = time.perf_counter()
+        result = work(item)
+        return time.perf_counter() - started, result is not None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(timed, items))
+    wall = time.perf_counter() - started
+    return _summarize([latency for latency, _ in results], wall, sum(1 for _, ok in results if not ok))
+
+def _run_child(stage, args, workdir):
+    command = [sys.executable, os.path.abspath(__file__), "--child", stage,
+               "--recognizer-url", args.recognizer_url, "--stability-url", args.stability_url]
+    for option in ("items", "seconds", "workers", "size", "steps", "seed"):
+        command += [f"--{option}", str(getattr(args, option))]
+    result = subprocess.run(
+        command, cwd=workdir, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.getenv("PYTHONPATH")]))},
+    )
+    if result.returncode != 0:
+        return {"error": (result.stderr or result.stdout).strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_benchmarks(args):
+    """
+    Start the stub servers and run every requested stage in its own interpreter
+
+    Returns:
+        dict: Stage name -> summary from run_stage(), or {"error"}
+    """
+    sys.path.insert(0, ROOT)
+    from transcriptor import serve_stub as serve_recognizer
+    from painter import serve_stub as serve_stability
+
+    recognizer, args.recognizer_url = serve_recognizer(
+        latency=args.recognizer_latency, jitter=args.jitter, seed=args.seed
+    )
+    stability, args.stability_url = serve_stability(
+        latency=args.stability_latency, jitter=args.jitter, image_size=args.size, seed=args.seed
+    )
+    results = {}
+    try:
+        for stage in args.stages:
+            # Artifacts go to a scratch directory so runs don't see each other's files
+            workdir = tempfile.mkdtemp(prefix=f"voicedraw_bench_{stage}_")
+            try:
+                results[stage] = _run_child(stage, args, workdir)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        recognizer.shutdown()
+        stability.shutdown()
+    return results
+
+def compare(results, baseline, tolerance):
+    """
+    Compare against a baseline
+
+    Returns:
+        list: "stage: metric" for every p95 latency or peak RSS above
+            baseline * (1 + tolerance) and every throughput below
+            baseline * (1 - tolerance)
+    """
+    regressions = []
+    for stage, result in results.items():
+        before = baseline.get(stage, {})
+        if "error" in result or "error" in before or not before:
+            continue
+        for metric in ("p95", "peak_rss_mb"):
+            if result[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{stage}: {metric}")
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{stage}: throughput")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VoiceDraw offline pipeline benchmark")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES, help="Stages to run")
+    parser.add_argument("--items", type=int, default=20, help="Items per stage")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Length of each synthetic take")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent items")
+    parser.add_argument("--recognizer-latency", type=float, default=0.2, help="Stub recognizer latency (s)")
+    parser.add_argument("--stability-latency", type=float, default=0.5, help="Stub image API latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Uniform jitter added to stub latencies (s)")
+    parser.add_argument("--size", type=int, default=64, help="Side of the stub images in pixels")
+    parser.add_argument("--steps", type=int, default=30, help="Diffusion steps sent to the API")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for audio and stub randomness")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing")
+    parser.add_argument("--child", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--recognizer-url", help=argparse.SUPPRESS)
+    parser.add_argument("--stability-url", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        # Keep the service modules' progress output off stdout, which carries the result
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        result = run_stage(args.child, args)
+        print(json.dumps(result), file=stdout)
+        return 0
+
+    results = run_benchmarks(args)
+    print(f"{'stage':<12} {'items/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8} {'errors':>7}")
+    for stage, result in results.items():
+        if "error" in result:
+            print(f"{stage:<12} hata: {result['error']}")
+        else:
+            print(f"{stage:<12} {result['throughput']:>8} {result['p50'] * 1000:>9.1f} {result['p95'] * 1000:>9.1f} "
+                  f"{result['p99'] * 1000:>9.1f} {result['peak_rss_mb']:>8} {result['errors']:>7}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Yavaşlama / Regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import threading
+import traceback
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created TEXT NOT NULL,
+    transcript TEXT NOT NULL DEFAULT '',
+    language TEXT,
+    audio_path TEXT,
+    transcript_path TEXT UNIQUE,
+    image_path TEXT
+);
+"""
+
+# External-content FTS index kept in sync with `entries` by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    transcript, content='entries', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, transcript) VALUES (new.id, new.transcript);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, transcript) VALUES ('delete', old.id, old.transcript);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE OF transcript ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, transcript) VALUES ('delete', old.id, old.transcript);
+    INSERT INTO entries_fts(rowid, transcript) VALUES (new.id, new.transcript);
+END;
+"""
+
+COLUMNS = ("id", "created", "transcript", "language", "audio_path", "transcript_path", "image_path")
+
+def _match_query(text):
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix
+    """
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+class HistoryStore:
+    def __init__(self, path="history.db"):
+        """
+        Persistent history of audio, transcript and image artifacts
+
+        Entries live in SQLite so they survive sessions. Transcripts are
+        indexed with FTS5 when the SQLite build supports it, otherwise search
+        falls back to LIKE. Pages are read with keyset pagination on the entry
+        id, so a page costs the same no matter how deep into the history it is.
+
+        Args:
+            path (str): SQLite database file
+        """
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # One connection shared by Streamlit's script threads and the job workers
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self.full_text = True
+        except sqlite3.OperationalError:
+            print("UYARI: SQLite FTS5 desteklemiyor, arama LIKE ile yapılacak")
+            self.full_text = False
+        self._conn.commit()
+
+    def add(self, transcript, image_path=None, audio_path=None, transcript_path=None, language=None, created=None):
+        """
+        Record one result
+
+        Args:
+            transcript (str): Transcript or prompt text
+            image_path (str): Generated image
+            audio_path (str): Source audio
+            transcript_path (str): Saved transcript file
+            language (str): Language code of the transcript
+            created (str): Timestamp, now if None
+
+        Returns:
+            int: Entry ID, or None on error
+        """
+        created = created or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            with self._lock, self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO entries (created, transcript, language, audio_path, transcript_path, image_path) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (created, transcript or "", language, audio_path, transcript_path, image_path)
+                )
+            return cursor.lastrowid
+        except Exception as e:
+            print(f"Geçmiş kaydı eklenemedi: {e}")
+            traceback.print_exc()
+            return None
+
+    def update(self, entry_id, **fields):
+        """
+        Change columns of an entry, e.g. set image_path once the image is ready
+        """
+        fields = {key: value for key, value in fields.items() if key in COLUMNS and key != "id"}
+        if not fields:
+            return
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE entries SET {assignments} WHERE id = ?", (*fields.values(), entry_id))
+
+    def get(self, entry_id):
+        """
+        Returns:
+            dict: Entry, or None if it doesn't exist
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return dict(row) if row else None
+
+    def delete(self, entry_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+
+    def _where(self, query, before):
+        clauses, params = [], []
+        if query and query.strip():
+            if self.full_text:
+                clauses.append("id IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)")
+                params.append(_match_query(query))
+            else:
+                for term in query.split():
+                    clauses.append("transcript LIKE ? ESCAPE '\\'")
+                    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                    params.append(f"%{escaped}%")
+        if before is not None:
+            clauses.append("id < ?")
+            params.append(before)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def page(self, before=None, limit=5, query=None):
+        """
+        Read one page of entries, newest first
+
+        Args:
+            before (int): Only return entries older than this ID (the cursor
+                returned for the previous page); None for the first page
+            limit (int): Page size
+            query (str): Optional search text matched against transcripts
+
+        Returns:
+            tuple: (list of entry dicts, cursor for the next page or None)
+        """
+        where, params = self._where(query, before)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM entries{where} ORDER BY id DESC LIMIT ?", (*params, limit + 1)
+            ).fetchall()
+        entries = [dict(row) for row in rows[:limit]]
+        cursor = entries[-1]["id"] if len(rows) > limit else None
+        return entries, cursor
+
+    def count(self, query=None):
+        """
+        Returns:
+            int: Number of entries, optionally only those matching `query`
+        """
+        where, params = self._where(query, None)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM entries{where}", params).fetchone()[0]
+
+    def index_transcripts(self, directory="transcripts"):
+        """
+        Add transcript files that aren't in the history yet, such as those
+        written before the history was persisted
+
+        Returns:
+            int: Number of entries added
+        """
+        if not os.path.isdir(directory):
+            return 0
+        with self._lock:
+            known = {
+                os.path.normpath(row[0])
+                for row in self._conn.execute("SELECT transcript_path FROM entries WHERE transcript_path IS NOT NULL")
+            }
+
+        added = 0
+        for root, subdirectories, files in os.walk(directory):
+            # Skip hidden directories such as the transcript cache
+            subdirectories[:] = sorted(d for d in subdirectories if not d.startswith("."))
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                # Files linked to an entry (e.g. by the app or the pipeline) are already there
+                if not name.endswith(".txt") or os.path.normpath(path) in known:
+                    continue
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        text = f.read()
+                except (OSError, UnicodeDecodeError):
+                    continue
+                created = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S")
+                if self.add(text, transcript_path=path, created=created):
+                    added += 1
+        return added
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
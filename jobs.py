@@ -0,0 +1,336 @@
+import os
+import json
+import time
+import uuid
+import threading
+import traceback
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# Job and stage states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Finished jobs are forgotten (in memory and on disk) once their file is this old
+JOB_RETENTION_HOURS = 24
+# Seconds between retention passes, which run when a job is submitted
+JOB_PRUNE_INTERVAL = 600
+
+class JobManager:
+    def __init__(self, transcriptor=None, directory="jobs", transcribe_workers=2, paint_workers=2,
+                 retention_hours=JOB_RETENTION_HOURS):
+        """
+        Background job queue for transcription and image generation
+
+        Each stage has its own worker pool, so a pipeline job's image generation
+        runs while the next job is already being transcribed. Job state is kept
+        in memory and persisted as one JSON file per job, so the UI can poll it
+        across reruns and sessions. Finished jobs are dropped after
+        `retention_hours` (see prune()).
+
+        Args:
+            transcriptor (Transcriptor): Transcriptor used by transcription stages
+                (created on first use if None)
+            directory (str): Directory for persisted job files
+            transcribe_workers (int): Concurrent transcription stages
+            paint_workers (int): Concurrent image generation stages
+            retention_hours (float): Age after which finished jobs are removed, None to keep them
+        """
+        self.directory = directory
+        self.retention_hours = retention_hours
+        self._last_prune = 0.0
+        self._transcriptor = transcriptor
+        self._jobs = {}
+        self._cancel_events = {}
+        self._lock = threading.Lock()
+        self._transcribe_pool = ThreadPoolExecutor(max_workers=transcribe_workers, thread_name_prefix="transcribe")
+        self._paint_pool = ThreadPoolExecutor(max_workers=paint_workers, thread_name_prefix="paint")
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def transcriptor(self):
+        if self._transcriptor is None:
+            from transcriptor import Transcriptor
+            self._transcriptor = Transcriptor()
+        return self._transcriptor
+
+    def _create(self, kind, stages, params):
+        if self.retention_hours and time.time() - self._last_prune > JOB_PRUNE_INTERVAL:
+            self.prune()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": QUEUED,
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "params": params,
+            "stages": {name: {"status": QUEUED, "result": None, "error": None} for name in stages},
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._cancel_events[job["id"]] = threading.Event()
+            self._persist(job)
+        return job
+
+    def prune(self):
+        """
+        Remove finished jobs whose file is older than `retention_hours`
+
+        Files left by earlier processes are removed too; queued and running
+        jobs are kept.
+
+        Returns:
+            int: Number of jobs removed
+        """
+        self._last_prune = time.time()
+        if not self.retention_hours:
+            return 0
+        cutoff = time.time() - self.retention_hours * 3600
+        removed = 0
+        with self._lock:
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return 0
+            for name in names:
+                path = os.path.join(self.directory, name)
+                try:
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                    job_id = name.split(".", 1)[0]
+                    job = self._jobs.get(job_id)
+                    if job and job["status"] in (QUEUED, RUNNING):
+                        continue
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._jobs.pop(job_id, None)
+                self._cancel_events.pop(job_id, None)
+                if name.endswith(".json"):
+                    removed += 1
+        if removed:
+            print(f"{self.directory}: {removed} eski iş silindi")
+        return removed
+
+    def _persist(self, job):
+        # Called with the lock held
+        path = os.path.join(self.directory, f"{job['id']}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _update_stage(self, job, stage, status, result=None, error=None):
+        with self._lock:
+            job["stages"][stage].update({
+                "status": status,
+                "result": result,
+                "error": error,
+                "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            })
+            statuses = [s["status"] for s in job["stages"].values()]
+            if FAILED in statuses:
+                job["status"] = FAILED
+            elif CANCELLED in statuses:
+                job["status"] = CANCELLED
+            elif all(s == DONE for s in statuses):
+                job["status"] = DONE
+            elif RUNNING in statuses or DONE in statuses:
+                job["status"] = RUNNING
+            self._persist(job)
+
+    def _run_stage(self, job, stage, work, then=None):
+        """
+        Run one stage of a job and hand its result to the next stage
+        """
+        cancel = self._cancel_events.get(job["id"])
+        if cancel is None or cancel.is_set():
+            # Cancelled, or already pruned while the stage was waiting in the queue
+            return
+        self._update_stage(job, stage, RUNNING)
+        try:
+            result = work()
+        except Exception as e:
+            print(f"İş aşaması başarısız ({stage}): {e}")
+            traceback.print_exc()
+            self._update_stage(job, stage, FAILED, error=str(e))
+            return
+
+        if cancel.is_set():
+            # Keep whatever was produced, but don't start the next stage
+            self._update_stage(job, stage, CANCELLED, result=result)
+            return
+
+        if result is None:
+            self._update_stage(job, stage, FAILED, error=f"{stage} sonuç üretmedi")
+            return
+
+        self._update_stage(job, stage, DONE, result=result)
+        if then:
+            then(result)
+
+    def _transcribe(self, audio_path, language, audio=None, sample_rate=None):
+        # In-memory samples (e.g. a take from the recorder) skip reading the file back
+        if audio is not None:
+            text = self.transcriptor.transcribe(audio, language=language, sample_rate=sample_rate)
+        else:
+            text = self.transcriptor.transcribe(audio_path, language=language)
+        if not text:
+            return None
+        transcript_path = self.transcriptor.save_transcript(text)
+        return {"text": text, "transcript_path": transcript_path}
+
+    def _paint(self, painter, prompt, paint_params, cancel=None):
+        image_path = painter.paint(prompt=prompt, cancel=cancel, **paint_params)
+        return {"image_path": image_path} if image_path else None
+
+    def _paint_draft(self, painter, prompt, paint_params, cancel=None):
+        # A missing draft doesn't stop the final image
+        return {"image_path": painter.paint_draft(prompt=prompt, cancel=cancel, **paint_params)}
+
+    def submit_transcription(self, audio_path, language="tr-TR", audio=None, sample_rate=None):
+        """
+        Queue a transcription job
+
+        Args:
+            audio_path (str): Audio file (recorded in the job; may be None with `audio`)
+            language (str): Language code
+            audio (np.ndarray): Samples to transcribe instead of reading `audio_path`
+                (not persisted)
+            sample_rate (int): Sample rate of `audio`
+
+        Returns:
+            str: Job ID
+        """
+        job = self._create("transcribe", ["transcribe"], {"audio_path": audio_path, "language": language})
+        self._transcribe_pool.submit(
+            self._run_stage, job, "transcribe", lambda: self._transcribe(audio_path, language, audio, sample_rate)
+        )
+        return job["id"]
+
+    def submit_painting(self, painter, prompt, **paint_params):
+        """
+        Queue an image generation job
+
+        Args:
+            painter (StableDiffusionPainter): Painter to generate with (not persisted)
+            prompt (str): Text prompt
+            **paint_params: Extra arguments for painter.paint()
+
+        Returns:
+            str: Job ID
+        """
+        job = self._create("paint", ["paint"], {"prompt": prompt, **paint_params})
+        cancel = self._cancel_events[job["id"]]
+        self._paint_pool.submit(
+            self._run_stage, job, "paint", lambda: self._paint(painter, prompt, paint_params, cancel)
+        )
+        return job["id"]
+
+    def submit_progressive(self, painter, prompt, **paint_params):
+        """
+        Queue an image generation job with a quick draft stage before the final image
+
+        The "draft" stage renders a cheap preview (see painter.paint_draft()) that
+        the UI can show while the "paint" stage renders the final image with the
+        same seed. Cancel the job once its prompt is stale: if the final image
+        hasn't been requested yet, it never is.
+
+        Args:
+            painter (StableDiffusionPainter): Painter to generate with (not persisted)
+            prompt (str): Text prompt
+            **paint_params: Extra arguments for painter.paint(); painter.seed_for()
+                picks the seed if none is given
+
+        Returns:
+            str: Job ID
+        """
+        paint_params["seed"] = painter.seed_for(prompt, **paint_params)
+        job = self._create("progressive", ["draft", "paint"], {"prompt": prompt, **paint_params})
+        cancel = self._cancel_events[job["id"]]
+
+        def queue_final(result):
+            self._paint_pool.submit(
+                self._run_stage, job, "paint", lambda: self._paint(painter, prompt, paint_params, cancel)
+            )
+
+        self._paint_pool.submit(
+            self._run_stage, job, "draft", lambda: self._paint_draft(painter, prompt, paint_params, cancel), queue_final
+        )
+        return job["id"]
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: stages that haven't started are skipped, and a running
+        paint stage doesn't send its request if it hasn't yet
+
+        Returns:
+            bool: True if the job was still queued or running
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["status"] in (DONE, FAILED, CANCELLED):
+                return False
+            self._cancel_events[job_id].set()
+            for stage in job["stages"].values():
+                if stage["status"] == QUEUED:
+                    stage["status"] = CANCELLED
+            job["status"] = CANCELLED
+            self._persist(job)
+        return True
+
+    def submit_pipeline(self, painter, audio_path, language="tr-TR", audio=None, sample_rate=None, **paint_params):
+        """
+        Queue a transcription job whose transcript is then turned into an image
+
+        The paint stage is queued on its own pool as soon as transcription
+        finishes, freeing the transcription worker for the next job. `audio`
+        and `sample_rate` work as in submit_transcription().
+
+        Returns:
+            str: Job ID
+        """
+        job = self._create(
+            "pipeline", ["transcribe", "paint"],
+            {"audio_path": audio_path, "language": language, **paint_params}
+        )
+
+        cancel = self._cancel_events[job["id"]]
+
+        def queue_paint(result):
+            self._paint_pool.submit(
+                self._run_stage, job, "paint", lambda: self._paint(painter, result["text"], paint_params, cancel)
+            )
+
+        self._transcribe_pool.submit(
+            self._run_stage, job, "transcribe", lambda: self._transcribe(audio_path, language, audio, sample_rate),
+            queue_paint
+        )
+        return job["id"]
+
+    def get(self, job_id):
+        """
+        Return a snapshot of a job, loading it from disk if it isn't in memory
+
+        Returns:
+            dict: Job state, or None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return json.loads(json.dumps(job))
+
+        try:
+            with open(os.path.join(self.directory, f"{job_id}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def shutdown(self, wait=True):
+        """
+        Stop accepting jobs and optionally wait for running ones
+        """
+        self._transcribe_pool.shutdown(wait=wait)
+        self._paint_pool.shutdown(wait=wait)
@@ -0,0 +1,291 @@
+"""
+Lightweight timing and counter instrumentation
+
+Hot paths are wrapped in spans:
+
+    with metrics.span("transcriptor.recognize", backend="google"):
+        ...
+
+and events are counted with metrics.count("painter_retries_total"). Spans
+feed latency histograms and, optionally, one JSON log line each. Everything is
+off unless VOICEDRAW_METRICS=1 (or enable() is called); while off, span()
+returns a shared no-op context manager and count() returns immediately.
+
+Metrics can be read as Prometheus text (render_prometheus()), as a dict
+(snapshot()) or over HTTP with serve().
+"""
+import os
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds of the latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+SPAN_METRIC = "voicedraw_stage_seconds"
+
+_enabled = os.getenv("VOICEDRAW_METRICS", "") not in ("", "0")
+_lock = threading.Lock()
+_metrics = {}
+_log = logging.getLogger("voicedraw.metrics")
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _header(name, help, kind):
+    return ([f"# HELP {name} {help}"] if help else []) + [f"# TYPE {name} {kind}"]
+
+class Counter:
+    def __init__(self, name, help=""):
+        """
+        Monotonic counter with labels
+
+        Args:
+            name (str): Metric name
+            help (str): Description shown in the Prometheus output
+        """
+        self.name = name
+        self.help = help
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = _header(self.name, self.help, "counter")
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+    def snapshot(self):
+        return [{"labels": dict(key), "value": value} for key, value in sorted(self._values.items())]
+
+class Histogram:
+    def __init__(self, name, help="", buckets=DEFAULT_BUCKETS):
+        """
+        Cumulative histogram with labels, in Prometheus layout
+
+        Args:
+            name (str): Metric name
+            help (str): Description shown in the Prometheus output
+            buckets (tuple): Sorted upper bounds; +Inf is added automatically
+        """
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = _header(self.name, self.help, "histogram")
+        for key, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+    def snapshot(self):
+        return [
+            {"labels": dict(key), "count": series["count"], "sum": series["sum"],
+             "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], series["counts"]))}
+            for key, series in sorted(self._values.items())
+        ]
+
+def _get(cls, name, help):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, help)
+        return metric
+
+def counter(name, help=""):
+    """
+    Return the counter called `name`, creating it on first use
+    """
+    return _get(Counter, name, help)
+
+def histogram(name, help=""):
+    """
+    Return the histogram called `name`, creating it on first use
+    """
+    return _get(Histogram, name, help)
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **labels):
+        pass
+
+_NOOP = _NoopSpan()
+
+class Span:
+    def __init__(self, name, labels):
+        """
+        Times a block and records it under SPAN_METRIC{stage=name, ...}
+        """
+        self.name = name
+        self.labels = labels
+
+    def set(self, **labels):
+        """
+        Add labels that are only known inside the block (e.g. a status code)
+        """
+        self.labels.update(labels)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        elapsed = time.perf_counter() - self.started
+        outcome = "error" if exc_type else "ok"
+        histogram(SPAN_METRIC, "Duration of instrumented stages").observe(
+            elapsed, stage=self.name, outcome=outcome, **self.labels
+        )
+        if _log.isEnabledFor(logging.INFO):
+            _log.info(json.dumps({
+                "ts": round(time.time(), 6),
+                "span": self.name,
+                "seconds": round(elapsed, 6),
+                "outcome": outcome,
+                **self.labels,
+            }, ensure_ascii=False, default=str))
+        return False
+
+def span(name, **labels):
+    """
+    Context manager timing one stage
+
+    Args:
+        name (str): Stage name, e.g. "painter.http"
+        **labels: Extra labels, e.g. backend="google"
+
+    Returns:
+        Context manager (a no-op while metrics are disabled)
+    """
+    if not _enabled:
+        return _NOOP
+    return Span(name, labels)
+
+def count(name, amount=1, **labels):
+    """
+    Increase a counter (no-op while metrics are disabled)
+    """
+    if _enabled:
+        counter(name).inc(amount, **labels)
+
+def enabled():
+    return _enabled
+
+def enable(flag=True, json_log=None):
+    """
+    Turn collection on or off
+
+    Args:
+        flag (bool): Collect spans and counters
+        json_log (str): Also write one JSON line per span; "-" for stderr or a
+            file path (defaults to $VOICEDRAW_METRICS_LOG)
+    """
+    global _enabled
+    _enabled = flag
+    json_log = json_log if json_log is not None else os.getenv("VOICEDRAW_METRICS_LOG")
+    if flag and json_log and not _log.handlers:
+        handler = logging.StreamHandler(sys.stderr) if json_log == "-" else logging.FileHandler(json_log, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _log.addHandler(handler)
+        _log.setLevel(logging.INFO)
+        _log.propagate = False
+
+def reset():
+    """
+    Drop every collected value
+    """
+    with _lock:
+        _metrics.clear()
+
+def render_prometheus():
+    """
+    Returns:
+        str: All metrics in the Prometheus text exposition format
+    """
+    with _lock:
+        metrics = sorted(_metrics.items())
+        lines = []
+        for _, metric in metrics:
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def snapshot():
+    """
+    Returns:
+        dict: Metric name -> list of labelled series
+    """
+    with _lock:
+        return {name: metric.snapshot() for name, metric in sorted(_metrics.items())}
+
+def serve(host="127.0.0.1", port=0):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a background thread
+
+    Args:
+        host (str): Interface to listen on
+        port (int): Port, 0 for any free port
+
+    Returns:
+        tuple: (server, url) — call server.shutdown() to stop it
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body, content_type = json.dumps(snapshot()).encode("utf-8"), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, content_type = render_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+if _enabled:
+    enable(True)
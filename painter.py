@@ -1,42 +1,594 @@
 import os
 import io
+import time
+import uuid
 import base64
+import hashlib
+import asyncio
+import tempfile
+import threading
+import traceback
+import random
 import requests
 import json
-from PIL import Image
-from datetime import datetime
+from collections import Counter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from dotenv import load_dotenv
+from storage import get_store
+import metrics
 
 # Load environment variables
 load_dotenv()
 
+# Responses worth retrying; urllib3 honours Retry-After on 429 and 503
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def create_session(pool_size=10, retries=3, backoff_factor=0.5):
+    """
+    Create a keep-alive HTTP session with a connection pool and retry policy
+    
+    Args:
+        pool_size (int): Maximum number of pooled connections per host
+        retries (int): Retries for connection errors and retryable statuses; read
+            timeouts are never retried, since the server may still bill the POST
+        backoff_factor (float): Base of the exponential backoff between retries
+    
+    Returns:
+        requests.Session: Session with the adapter mounted for http and https
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        # False re-raises read errors as is, so callers see requests.Timeout
+        read=False,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Largest "samples" value accepted by the generation endpoint
+MAX_SAMPLES = 10
+
+# Buffer size used when streaming binary image responses to disk
+STREAM_CHUNK_SIZE = 64 * 1024
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """
+        Token bucket rate limiter usable from threads and any event loop
+        
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum burst size (defaults to one second of tokens)
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self, tokens):
+        """
+        Take tokens if available, otherwise return how long to wait for them
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+    
+    async def acquire(self, tokens=1):
+        """
+        Wait without blocking the event loop until `tokens` are available
+        """
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+    
+    def acquire_blocking(self, tokens=1):
+        """
+        Block the calling thread until `tokens` are available
+        """
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+# Process-wide limiter matched to the API quota (requests per second)
+RATE_LIMITER = TokenBucket(rate=float(os.getenv("STABILITY_RATE_LIMIT", "15")))
+
+def generation_key(prompt, negative_prompt, width, height, cfg_scale, steps, seed, engine_id):
+    """
+    Build a deterministic cache key from normalized generation parameters
+    
+    Whitespace in the prompts is collapsed so trivially different transcripts
+    map to the same request.
+    
+    Returns:
+        str: Hex digest
+    """
+    params = {
+        "prompt": " ".join(prompt.split()),
+        "negative_prompt": " ".join((negative_prompt or "").split()),
+        "width": int(width),
+        "height": int(height),
+        "cfg_scale": float(cfg_scale),
+        "steps": int(steps),
+        "seed": seed,
+        "engine_id": engine_id,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+class ImageCache:
+    def __init__(self, directory="images", max_bytes=None):
+        """
+        Cache of generated images keyed by request parameters
+        
+        The index maps keys to image files in `directory` together with their
+        size and last use. The images belong to the directory's ArtifactStore,
+        whose janitor enforces the byte budget; entries whose files it removed
+        are dropped from the index. With `max_bytes` the cache also deletes the
+        least recently used images once they exceed it. The index is written on
+        put() only. Use get_image_cache() so every painter over the same
+        directory shares one instance.
+        
+        Args:
+            directory (str): Directory holding the images and the index file
+            max_bytes (int): Extra byte budget of the cached images, None for the store's only
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, ".cache_index.json")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+    
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+    
+    def get(self, key):
+        """
+        Return the cached image path for `key`, or None
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry and os.path.exists(entry["path"]):
+                entry["used"] = time.time()
+                self.hits += 1
+                return entry["path"]
+            if entry:
+                # The file was removed behind our back
+                del self._index[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key, path):
+        """
+        Record a freshly generated image and evict old ones past the budget
+        
+        An image replaced under the same key (a fresh sample) is only dropped
+        from the index: the history may still show it.
+        """
+        with self._lock:
+            self._index[key] = {"path": path, "size": os.path.getsize(path), "used": time.time()}
+            # Forget images the storage janitor has swept, so they don't count toward the budget
+            for old_key in [old_key for old_key, entry in self._index.items() if not os.path.exists(entry["path"])]:
+                del self._index[old_key]
+            
+            if self.max_bytes is not None:
+                total = sum(entry["size"] for entry in self._index.values())
+                for old_key, entry in sorted(self._index.items(), key=lambda item: item[1]["used"]):
+                    if total <= self.max_bytes or old_key == key:
+                        break
+                    try:
+                        os.remove(entry["path"])
+                    except OSError:
+                        pass
+                    total -= entry["size"]
+                    del self._index[old_key]
+            self._save_index()
+
+# One image cache per directory, so painters never overwrite each other's index
+_IMAGE_CACHES = {}
+_IMAGE_CACHES_LOCK = threading.Lock()
+
+def get_image_cache(directory="images", max_bytes=None):
+    """
+    Return the shared image cache of a directory, creating it on first use
+    
+    Args:
+        directory (str): Directory holding the images and the index file
+        max_bytes (int): Extra byte budget, used when the cache is created
+    
+    Returns:
+        ImageCache: Shared cache
+    """
+    key = os.path.abspath(directory)
+    with _IMAGE_CACHES_LOCK:
+        cache = _IMAGE_CACHES.get(key)
+        if cache is None:
+            cache = ImageCache(directory, max_bytes)
+            _IMAGE_CACHES[key] = cache
+        return cache
+
+def create_thumbnail(image_path, size=256, directory=None):
+    """
+    Create (or reuse) a small JPEG derivative of an image
+    
+    Thumbnails are keyed by a hash of the image contents, so each image is only
+    downscaled once no matter how often it is displayed.
+    
+    Args:
+        image_path (str): Path to the full-size image
+        size (int): Longest side of the thumbnail in pixels
+        directory (str): Thumbnail directory (defaults to "thumbnails" next to the image)
+    
+    Returns:
+        str: Path to the thumbnail, or the original path if it can't be created
+    """
+    directory = directory or os.path.join(os.path.dirname(image_path), "thumbnails")
+    try:
+        digest = hashlib.sha256()
+        with open(image_path, "rb") as f:
+            for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        thumb_path = os.path.join(directory, f"{digest.hexdigest()[:32]}_{size}.jpg")
+        if os.path.exists(thumb_path):
+            return thumb_path
+        
+        os.makedirs(directory, exist_ok=True)
+        from PIL import Image
+        
+        with Image.open(image_path) as img:
+            img.draft("RGB", (size, size))
+            img = img.convert("RGB")
+            img.thumbnail((size, size))
+            tmp_path = f"{thumb_path}.{uuid.uuid4().hex[:8]}.tmp"
+            img.save(tmp_path, format="JPEG", quality=85)
+        os.replace(tmp_path, thumb_path)
+        return thumb_path
+    except Exception as e:
+        print(f"Küçük resim oluşturulamadı: {e}")
+        return image_path
+
+def serve_stub(host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0, image_size=64, seed=None):
+    """
+    Serve a stand-in for the Stability text-to-image endpoint, for offline benchmarks
+    
+    Every request sleeps for `latency` ± `jitter` seconds, then fails with 503
+    with probability `error_rate` (which the session retries) or returns a
+    random `image_size` square PNG: raw for "Accept: image/png", otherwise one
+    base64 artifact per requested sample.
+    
+    Returns:
+        tuple: (server, url) - use url as api_host; stop with server.shutdown()
+    """
+    from PIL import Image
+    
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (image_size, image_size), rng.randbytes(image_size * image_size * 3)).save(buffer, format="PNG")
+    png = buffer.getvalue()
+    encoded = base64.b64encode(png).decode("ascii")
+    
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with lock:
+                delay = max(0.0, latency + rng.uniform(-jitter, jitter))
+                failed = rng.random() < error_rate
+            time.sleep(delay)
+            
+            if failed:
+                status, content_type, body = 503, "application/json", b'{"message": "stub: simulated overload"}'
+            elif self.headers.get("Accept") == "image/png":
+                status, content_type, body = 200, "image/png", png
+            else:
+                artifacts = [{"base64": encoded, "seed": i, "finishReason": "SUCCESS"}
+                             for i in range(request.get("samples", 1))]
+                status, content_type, body = 200, "application/json", json.dumps({"artifacts": artifacts}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+# Image backends other than the Stability API, by name (see register_backend)
+PAINTER_BACKENDS = {}
+
+def register_backend(name):
+    """
+    Register an image backend class under `name` for StableDiffusionPainter(backend=name)
+    """
+    def decorator(cls):
+        cls.name = name
+        PAINTER_BACKENDS[name] = cls
+        return cls
+    return decorator
+
+# Drafts of progressive generation run on the final image's engine and size with
+# fewer steps, so the shared seed previews the final composition (SDXL needs at least 10)
+DRAFT_STEPS = 10
+
+# Seeds accepted by the API
+MAX_SEED = 4294967295
+
+def random_seed():
+    """
+    Pick a seed so related requests (a draft and its final image) can share it
+    """
+    return random.randint(0, MAX_SEED)
+
+# CPU presets: requests are capped to these sizes and step counts. The default
+# model, sd-turbo, is distilled to run in 1-4 steps at 512x512 without
+# classifier-free guidance, so the presets also pin the guidance scale to 0
+LOCAL_PRESETS = {
+    "tiny": {"width": 64, "height": 64, "steps": 1, "guidance": 0.0},
+    "draft": {"width": 256, "height": 256, "steps": 1, "guidance": 0.0},
+    "fast": {"width": 512, "height": 512, "steps": 2, "guidance": 0.0},
+    "quality": {"width": 512, "height": 512, "steps": 4, "guidance": 0.0},
+}
+DEFAULT_LOCAL_MODEL = "stabilityai/sd-turbo"
+
+# Loaded pipelines by (model, threads, attention slicing), kept warm for the life of the process
+_PIPELINES = {}
+_PIPELINES_LOCK = threading.Lock()
+
+def load_pipeline(model_id, threads=None, attention_slicing=True):
+    """
+    Load a diffusers text-to-image pipeline on the CPU, once per process
+    
+    Args:
+        model_id (str): Hugging Face model ID or local directory
+        threads (int): torch intra-op threads (None keeps torch's default)
+        attention_slicing (bool): Compute attention in slices to lower peak memory
+    
+    Returns:
+        DiffusionPipeline: The shared pipeline
+    """
+    key = (model_id, threads, attention_slicing)
+    with _PIPELINES_LOCK:
+        if key in _PIPELINES:
+            return _PIPELINES[key]
+        
+        import torch
+        from diffusers import AutoPipelineForText2Image
+        
+        if threads:
+            torch.set_num_threads(threads)
+        with metrics.span("painter.local_load", model=model_id):
+            pipeline = AutoPipelineForText2Image.from_pretrained(model_id, torch_dtype=torch.float32)
+            pipeline = pipeline.to("cpu")
+        if attention_slicing:
+            pipeline.enable_attention_slicing()
+        pipeline.set_progress_bar_config(disable=True)
+        print(f"Yerel difüzyon modeli yüklendi: {model_id}")
+        _PIPELINES[key] = pipeline
+        return pipeline
+
+def build_tiny_pipeline(directory, seed=0):
+    """
+    Save a tiny, randomly initialized Stable Diffusion pipeline for offline tests
+    
+    The images are noise, but every component of the real pipeline runs, in
+    well under a second per image on a CPU. Use it with
+    StableDiffusionPainter(backend="local", model_id=directory, preset="tiny").
+    
+    Args:
+        directory (str): Where to save the pipeline
+        seed (int): Seed of the random weights
+    
+    Returns:
+        str: `directory`
+    """
+    import json as json_module
+    import torch
+    from diffusers import AutoencoderKL, DDIMScheduler, StableDiffusionPipeline, UNet2DConditionModel
+    from transformers import CLIPTextConfig, CLIPTextModel, CLIPTokenizer
+    from transformers.models.clip.tokenization_clip import bytes_to_unicode
+    
+    torch.manual_seed(seed)
+    unet = UNet2DConditionModel(
+        block_out_channels=(4, 8), layers_per_block=1, sample_size=32, in_channels=4, out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"), up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        cross_attention_dim=32, norm_num_groups=2,
+    )
+    vae = AutoencoderKL(
+        block_out_channels=[4, 8], in_channels=3, out_channels=3, latent_channels=4, norm_num_groups=2,
+        down_block_types=["DownEncoderBlock2D"] * 2, up_block_types=["UpDecoderBlock2D"] * 2,
+    )
+    scheduler = DDIMScheduler(
+        beta_start=0.00085, beta_end=0.012, beta_schedule="scaled_linear", clip_sample=False, set_alpha_to_one=False
+    )
+    text_encoder = CLIPTextModel(CLIPTextConfig(
+        bos_token_id=0, eos_token_id=1, pad_token_id=1, hidden_size=32, intermediate_size=64,
+        num_attention_heads=4, num_hidden_layers=2, vocab_size=1000,
+    ))
+    
+    # Byte-level vocabulary without merges, so the tokenizer needs no download
+    os.makedirs(directory, exist_ok=True)
+    symbols = list(bytes_to_unicode().values())
+    vocab = {"<|startoftext|>": 0, "<|endoftext|>": 1}
+    for symbol in symbols + [f"{symbol}</w>" for symbol in symbols]:
+        vocab[symbol] = len(vocab)
+    vocab_file = os.path.join(directory, "vocab.json")
+    merges_file = os.path.join(directory, "merges.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        json_module.dump(vocab, f)
+    with open(merges_file, "w", encoding="utf-8") as f:
+        f.write("#version: 0.2\n")
+    tokenizer = CLIPTokenizer(vocab_file, merges_file, model_max_length=77)
+    
+    pipeline = StableDiffusionPipeline(
+        unet=unet, vae=vae, scheduler=scheduler, text_encoder=text_encoder, tokenizer=tokenizer,
+        safety_checker=None, feature_extractor=None, requires_safety_checker=False,
+    )
+    pipeline.save_pretrained(directory)
+    return directory
+
+@register_backend("local")
+class LocalDiffusionBackend:
+    def __init__(self, model_id=None, preset="fast", threads=None, attention_slicing=True, guidance_scale=None):
+        """
+        Runs a diffusers pipeline in-process on the CPU
+        
+        The pipeline is loaded on first use and shared by every backend with the
+        same settings. Calls are serialized, since one forward pass already uses
+        all torch threads; several prompts are batched into one pass by generate().
+        
+        Args:
+            model_id (str): Model ID or directory (defaults to LOCAL_DIFFUSION_MODEL or sd-turbo)
+            preset (str): Key of LOCAL_PRESETS capping size and steps, None for no cap
+            threads (int): torch threads (defaults to LOCAL_DIFFUSION_THREADS)
+            attention_slicing (bool): Lower peak memory at a small speed cost
+            guidance_scale (float): Replaces the requested cfg_scale (defaults to the
+                preset's, 0 for sd-turbo; without a preset the request's is used)
+        """
+        self.model_id = model_id or os.getenv("LOCAL_DIFFUSION_MODEL", DEFAULT_LOCAL_MODEL)
+        self.preset = LOCAL_PRESETS[preset] if preset else None
+        threads = threads or os.getenv("LOCAL_DIFFUSION_THREADS")
+        self.threads = int(threads) if threads else None
+        self.attention_slicing = attention_slicing
+        if guidance_scale is None and self.preset:
+            guidance_scale = self.preset["guidance"]
+        self.guidance_scale = guidance_scale
+        # Part of the cache key, so local and API images never mix
+        self.engine_id = f"local:{self.model_id}"
+        self._lock = threading.Lock()
+    
+    @property
+    def pipeline(self):
+        return load_pipeline(self.model_id, self.threads, self.attention_slicing)
+    
+    def resolve(self, width, height, steps):
+        """
+        Apply the preset caps and round the size down to a multiple of 8
+        
+        Returns:
+            tuple: (width, height, steps)
+        """
+        if self.preset:
+            width = min(width, self.preset["width"])
+            height = min(height, self.preset["height"])
+            steps = min(steps, self.preset["steps"])
+        return max(8, width // 8 * 8), max(8, height // 8 * 8), max(1, steps)
+    
+    def generate(self, prompts, negative_prompt="", width=512, height=512, cfg_scale=0.0, steps=2,
+                 samples=1, seed=None):
+        """
+        Generate `samples` images for each prompt in a single forward pass
+        
+        Returns:
+            list: PIL images, grouped by prompt
+        """
+        import torch
+        
+        width, height, steps = self.resolve(width, height, steps)
+        if self.guidance_scale is not None:
+            cfg_scale = self.guidance_scale
+        pipeline = self.pipeline
+        generator = torch.Generator("cpu").manual_seed(seed) if seed is not None else None
+        with self._lock, torch.inference_mode(), metrics.span("painter.local_inference", batch=len(prompts) * samples):
+            result = pipeline(
+                prompt=list(prompts),
+                negative_prompt=[negative_prompt] * len(prompts) if negative_prompt else None,
+                width=width,
+                height=height,
+                num_inference_steps=steps,
+                guidance_scale=cfg_scale,
+                num_images_per_prompt=samples,
+                generator=generator,
+            )
+        return result.images
+
 class StableDiffusionPainter:
-    def __init__(self, output_directory="images"):
+    def __init__(self, output_directory="images", api_key=None, session=None, api_host=None,
+                 timeout=(5, 120), pool_size=10, retries=3, backoff_factor=0.5,
+                 cache_max_bytes=None, binary_transfer=True, backend=None, **backend_options):
         """
-        Initialize the painter with Stability AI API
+        Initialize the painter with Stability AI API or a local backend
         
         Args:
             output_directory (str): Directory to save generated images
+            api_key (str): Stability AI API key (defaults to STABILITY_API_KEY)
+            session: HTTP transport with a requests-compatible post() (defaults to a pooled session)
+            api_host (str): API base URL (defaults to STABILITY_API_HOST or the public API)
+            timeout (tuple): (connect, read) timeouts in seconds
+            pool_size (int): Connection pool size of the default session
+            retries (int): Retries of the default session
+            backoff_factor (float): Backoff factor of the default session
+            cache_max_bytes (int): Extra byte budget of the generated image cache on top of
+                the images store's (None for the store's only, 0 disables the cache)
+            binary_transfer (bool): Request single images as raw PNG streamed to disk
+                instead of base64 JSON
+            backend (str): "stability" for the API or a PAINTER_BACKENDS name such as
+                "local" (defaults to PAINTER_BACKEND or "stability")
+            **backend_options: Options of the backend, e.g. model_id, preset, threads
         """
         self.output_directory = output_directory
+        self.timeout = timeout
+        self.binary_transfer = binary_transfer
+        self.session = session or create_session(pool_size, retries, backoff_factor)
         
         # Create output directory if it doesn't exist
         if not os.path.exists(output_directory):
             os.makedirs(output_directory)
+        
+        self.storage = get_store(output_directory)
+        self.cache = get_image_cache(output_directory, cache_max_bytes) if cache_max_bytes != 0 else None
             
+        # Local backends generate in-process; None means the Stability API
+        backend = backend or os.getenv("PAINTER_BACKEND", "stability")
+        self.backend = None if backend == "stability" else PAINTER_BACKENDS[backend](**backend_options)
+        
         # Get API key from environment variable
-        self.api_key = os.getenv("STABILITY_API_KEY")
-        if not self.api_key:
+        self.api_key = api_key or os.getenv("STABILITY_API_KEY")
+        if not self.api_key and not self.backend:
             print("UYARI: STABILITY_API_KEY bulunamadı. .env dosyasında tanımlamanız gerekiyor.")
         
         # API endpoint
-        self.api_host = 'https://api.stability.ai'
+        self.api_host = api_host or os.getenv("STABILITY_API_HOST", 'https://api.stability.ai')
         self.engine_id = "stable-diffusion-xl-1024-v1-0"  # SDXL for high quality images
+        if self.backend:
+            self.engine_id = self.backend.engine_id
         
     def paint(self, prompt, negative_prompt="", width=1024, height=1024, 
-              cfg_scale=7.0, steps=30):
+              cfg_scale=7.0, steps=30, seed=None, use_cache=True, engine_id=None, cancel=None):
         """
-        Generate an image based on a text prompt using Stability AI API
+        Generate an image based on a text prompt using Stability AI API or the local backend
         
         Args:
             prompt (str): Text prompt to generate image from
@@ -45,14 +597,215 @@ class StableDiffusionPainter:
             height (int): Height of the output image
             cfg_scale (float): How strictly the diffusion process adheres to the prompt
             steps (int): Number of diffusion steps
+            seed (int): Explicit seed for reproducible images (None lets the API pick)
+            use_cache (bool): Return a stored image for identical parameters; False
+                always requests a fresh sample (which then replaces the stored one)
+            engine_id (str): API engine for this request (defaults to self.engine_id;
+                ignored by local backends)
+            cancel (threading.Event): If set before the request is sent (e.g. while
+                waiting for the rate limiter), nothing is generated
         
         Returns:
-            str: Path to the saved image file
+            str: Path to the saved image file (None on failure or when cancelled)
+        """
+        engine_id = self.engine_id if self.backend or not engine_id else engine_id
+        key = None
+        if self.cache:
+            key = generation_key(prompt, negative_prompt, width, height, cfg_scale, steps, seed, engine_id)
+            if use_cache:
+                cached_path = self.cache.get(key)
+                metrics.count("painter_cache_total", result="hit" if cached_path else "miss")
+                if cached_path:
+                    self.storage.touch(cached_path)
+                    print(f"Görüntü önbellekten alındı: {cached_path}")
+                    return cached_path
+        
+        if not self.backend:
+            if not self.api_key:
+                print("API anahtarı olmadan görüntü oluşturulamaz")
+                return None
+            with metrics.span("painter.rate_limit"):
+                RATE_LIMITER.acquire_blocking()
+        if cancel is not None and cancel.is_set():
+            print("Görüntü isteği iptal edildi")
+            metrics.count("painter_cancelled_total")
+            return None
+        paths = self._generate(prompt, negative_prompt, width, height, cfg_scale, steps, seed=seed, engine_id=engine_id)
+        if not paths:
+            return None
+        if key:
+            self.cache.put(key, paths[0])
+        return paths[0]
+    
+    def seed_for(self, prompt, negative_prompt="", width=1024, height=1024, cfg_scale=7.0, steps=30,
+                 seed=None, use_cache=True):
+        """
+        Seed for a draft and its final image
+        
+        Unless a seed is given, a fresh sample (use_cache=False) gets a random seed
+        and any other request one derived from its normalized parameters, so asking
+        for the same image again hits the image cache.
+        
+        Returns:
+            int: Seed
+        """
+        if seed is not None:
+            return seed
+        if not use_cache:
+            return random_seed()
+        key = generation_key(prompt, negative_prompt, width, height, cfg_scale, steps, None, self.engine_id)
+        return int(key[:8], 16)
+    
+    def draft_steps(self, steps):
+        """
+        Step count of the draft for a final image rendered with `steps`
+        
+        Returns:
+            int: DRAFT_STEPS for the API, the "draft" preset's steps for local backends
+        """
+        draft_steps = LOCAL_PRESETS["draft"]["steps"] if self.backend else DRAFT_STEPS
+        return min(steps, draft_steps)
+    
+    def paint_draft(self, prompt, negative_prompt="", width=1024, height=1024,
+                    cfg_scale=7.0, steps=30, seed=None, use_cache=True, cancel=None):
+        """
+        Generate a cheap preview of paint() with the same arguments
+        
+        The draft uses the same engine, size and seed as the final image and only
+        the step count from draft_steps(), so it shows the final composition early.
+        
+        Returns:
+            str: Path to the saved draft (None on failure or when cancelled)
+        """
+        with metrics.span("painter.draft"):
+            return self.paint(prompt, negative_prompt, width, height, cfg_scale,
+                              self.draft_steps(steps), seed, use_cache, cancel=cancel)
+    
+    def paint_progressive(self, prompt, negative_prompt="", width=1024, height=1024,
+                          cfg_scale=7.0, steps=30, seed=None, use_cache=True, on_draft=None, cancel=None):
+        """
+        Generate a quick draft and then the final image with the same seed
+        
+        Args:
+            prompt (str): Text prompt
+            on_draft: Optional function called with the draft path as soon as it is saved
+            cancel (threading.Event): Set it to skip whatever hasn't been requested yet,
+                e.g. the final image once the prompt has changed
+            **: Otherwise the same as paint(); seed_for() picks the seed if None
+        
+        Returns:
+            dict: seed, draft_path and image_path (None if that image failed or was cancelled)
+        """
+        seed = self.seed_for(prompt, negative_prompt, width, height, cfg_scale, steps, seed, use_cache)
+        draft_path = self.paint_draft(prompt, negative_prompt, width, height, cfg_scale, steps, seed, use_cache, cancel)
+        if draft_path and on_draft:
+            on_draft(draft_path)
+        image_path = self.paint(prompt, negative_prompt, width, height, cfg_scale, steps, seed, use_cache, cancel=cancel)
+        return {"seed": seed, "draft_path": draft_path, "image_path": image_path}
+    
+    def paint_batch(self, prompts, negative_prompt="", width=1024, height=1024,
+                    cfg_scale=7.0, steps=30, seed=None, use_cache=True):
+        """
+        Generate one image per prompt
+        
+        With a local backend every prompt missing from the cache goes through a
+        single batched forward pass; with the API the prompts are painted one by one.
+        
+        Args:
+            prompts (list): Text prompts
+            **: Same as paint()
+        
+        Returns:
+            list: Image path (or None on failure) for each prompt, in order
+        """
+        if not self.backend:
+            return [
+                self.paint(prompt, negative_prompt, width, height, cfg_scale, steps, seed, use_cache)
+                for prompt in prompts
+            ]
+        
+        paths = [None] * len(prompts)
+        keys = [generation_key(prompt, negative_prompt, width, height, cfg_scale, steps, seed, self.engine_id)
+                for prompt in prompts]
+        if self.cache and use_cache:
+            for i, key in enumerate(keys):
+                paths[i] = self.cache.get(key)
+                metrics.count("painter_cache_total", result="hit" if paths[i] else "miss")
+        
+        missing = [i for i, path in enumerate(paths) if path is None]
+        if missing:
+            generated = self._generate_local(
+                [prompts[i] for i in missing], negative_prompt, width, height, cfg_scale, steps, seed=seed
+            )
+            for i, path in zip(missing, generated):
+                paths[i] = path
+                if self.cache:
+                    self.cache.put(keys[i], path)
+        return paths
+    
+    async def paint_many(self, prompts, concurrency=4, limiter=None, max_samples=MAX_SAMPLES, **params):
         """
+        Generate images for many prompts concurrently
+        
+        Repeated prompts are folded into a single request with "samples" > 1.
+        Requests run in worker threads over the pooled session, at most
+        `concurrency` at a time and no faster than the rate limiter allows.
+        
+        Args:
+            prompts (list): Text prompts, duplicates allowed
+            concurrency (int): Maximum number of requests in flight
+            limiter (TokenBucket): Rate limiter (defaults to the process-wide RATE_LIMITER)
+            max_samples (int): Largest number of images requested in one call
+            **params: negative_prompt, width, height, cfg_scale and steps as for paint()
+        
+        Yields:
+            tuple: (prompt, image_path) as soon as each image is saved; image_path is
+                None for every image of a failed request
+        """
+        limiter = limiter or RATE_LIMITER
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        batches = []
+        for prompt, count in Counter(prompts).items():
+            while count > 0:
+                samples = min(count, max_samples)
+                batches.append((prompt, samples))
+                count -= samples
+        
+        async def run(prompt, samples):
+            async with semaphore:
+                await limiter.acquire()
+                paths = await asyncio.to_thread(self._generate, prompt, samples=samples, **params)
+            return prompt, samples, paths
+        
+        tasks = [asyncio.create_task(run(prompt, samples)) for prompt, samples in batches]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                prompt, samples, paths = await next_done
+                if not paths:
+                    for _ in range(samples):
+                        yield prompt, None
+                for path in paths:
+                    yield prompt, path
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _generate(self, prompt, negative_prompt="", width=1024, height=1024,
+                  cfg_scale=7.0, steps=30, samples=1, seed=None, engine_id=None):
+        """
+        Send one generation request and save every returned image
+        
+        Returns:
+            list: Paths of the saved images (empty on failure)
+        """
+        if self.backend:
+            return self._generate_local([prompt], negative_prompt, width, height, cfg_scale, steps, samples, seed)
+        
         if not self.api_key:
             print("API anahtarı olmadan görüntü oluşturulamaz")
-            return None
-            
+            return []
+        
         try:
             print(f"Görüntü oluşturuluyor: '{prompt[:50]}...'")
             
@@ -71,48 +824,138 @@ class StableDiffusionPainter:
                     "weight": -1.0
                 })
             
-            # Prepare the API request
-            response = requests.post(
-                f"{self.api_host}/v1/generation/{self.engine_id}/text-to-image",
-                headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                },
-                json={
-                    "text_prompts": text_prompts,
-                    "cfg_scale": cfg_scale,
-                    "height": height,
-                    "width": width,
-                    "samples": 1,
-                    "steps": steps,
-                },
-            )
+            body = {
+                "text_prompts": text_prompts,
+                "cfg_scale": cfg_scale,
+                "height": height,
+                "width": width,
+                "samples": samples,
+                "steps": steps,
+            }
+            if seed is not None:
+                body["seed"] = seed
             
-            if response.status_code != 200:
-                print(f"API hatası: {response.status_code}")
-                print(response.text)
-                return None
+            # The binary mode returns exactly one image, so batches still use JSON
+            binary = self.binary_transfer and samples == 1
+            
+            # Prepare the API request; with stream=True this times the response headers only
+            with metrics.span("painter.http", binary=binary) as span:
+                response = self.session.post(
+                    f"{self.api_host}/v1/generation/{engine_id or self.engine_id}/text-to-image",
+                    headers={
+                        "Content-Type": "application/json",
+                        "Accept": "image/png" if binary else "application/json",
+                        "Authorization": f"Bearer {self.api_key}"
+                    },
+                    json=body,
+                    timeout=self.timeout,
+                    stream=binary,
+                )
+                span.set(status=response.status_code)
+            retries = getattr(getattr(response.raw, "retries", None), "history", ())
+            if retries:
+                metrics.count("painter_retries_total", len(retries))
+            
+            with response:
+                if response.status_code != 200:
+                    print(f"API hatası: {response.status_code}")
+                    print(response.text)
+                    return []
+                
+                if binary:
+                    with metrics.span("painter.write", transfer="stream"):
+                        img_path = self._stream_to_file(response)
+                    metrics.count("painter_bytes_written_total", os.path.getsize(img_path))
+                    print(f"Görüntü kaydedildi: {img_path}")
+                    return [img_path]
                 
-            data = response.json()
+                with metrics.span("painter.read_json"):
+                    data = response.json()
             
             # Get the image data
+            paths = []
             for i, image in enumerate(data["artifacts"]):
-                # Create a unique filename
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                img_filename = f"image_{timestamp}.png"
-                img_path = os.path.join(self.output_directory, img_filename)
+                img_path = self._new_image_path()
                 
                 # Save the image
-                with open(img_path, "wb") as f:
-                    f.write(base64.b64decode(image["base64"]))
+                with metrics.span("painter.decode"):
+                    image_bytes = base64.b64decode(image["base64"])
+                with metrics.span("painter.write", transfer="base64"):
+                    with open(img_path, "wb") as f:
+                        f.write(image_bytes)
+                metrics.count("painter_bytes_written_total", len(image_bytes))
                 
                 print(f"Görüntü kaydedildi: {img_path}")
-                return img_path
+                paths.append(img_path)
+            return paths
                 
+        except requests.Timeout:
+            print(f"API zaman aşımına uğradı ({self.timeout} sn)")
+            return []
         except Exception as e:
             print(f"Görüntü oluşturma hatası: {e}")
-            return None
+            return []
+    
+    def _generate_local(self, prompts, negative_prompt="", width=1024, height=1024,
+                        cfg_scale=7.0, steps=30, samples=1, seed=None):
+        """
+        Generate with the local backend and save every image
+        
+        Returns:
+            list: Paths of the saved images, grouped by prompt (empty on failure)
+        """
+        try:
+            print(f"Görüntü yerel olarak oluşturuluyor: {len(prompts)} metin")
+            images = self.backend.generate(
+                prompts, negative_prompt, width, height, cfg_scale, steps, samples=samples, seed=seed
+            )
+            paths = []
+            for image in images:
+                img_path = self._new_image_path()
+                with metrics.span("painter.write", transfer="local"):
+                    image.save(img_path, format="PNG")
+                metrics.count("painter_bytes_written_total", os.path.getsize(img_path))
+                print(f"Görüntü kaydedildi: {img_path}")
+                paths.append(img_path)
+            return paths
+        except Exception as e:
+            print(f"Yerel görüntü oluşturma hatası: {e}")
+            traceback.print_exc()
+            return []
+    
+    def _new_image_path(self):
+        """
+        Return a unique, sharded path for a new image in the output directory
+        """
+        return self.storage.new_path("image", ".png")
+    
+    def _stream_to_file(self, response):
+        """
+        Stream a binary response body into a temp file and move it into place
+        
+        Only one STREAM_CHUNK_SIZE buffer is held in memory, and readers never
+        see a partially written image.
+        
+        Returns:
+            str: Path to the saved image file
+        """
+        fd, tmp_path = tempfile.mkstemp(suffix=".part", dir=self.output_directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+            img_path = self._new_image_path()
+            os.replace(tmp_path, img_path)
+            return img_path
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    
+    def close(self):
+        """
+        Close the pooled connections of the HTTP session
+        """
+        self.session.close()
     
     def generate_image(self, prompt, negative_prompt="", width=1024, height=1024, 
                        cfg_scale=7.0, steps=30):
@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import traceback
+from recorder import ingest_audio, INGEST_EXTENSIONS
+from transcriptor import _expand_audio_paths
+
+# Marks the end of a stage's input
+STOP = object()
+
+class StageStats:
+    def __init__(self, name):
+        """
+        Counters for one pipeline stage
+
+        Args:
+            name (str): Stage name
+        """
+        self.name = name
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, started, ok):
+        finished = time.monotonic()
+        with self._lock:
+            self.processed += 1
+            if not ok:
+                self.failed += 1
+            self.busy += finished - started
+            self.started = started if self.started is None else min(self.started, started)
+            self.finished = finished if self.finished is None else max(self.finished, finished)
+
+    def summary(self):
+        """
+        Returns:
+            dict: processed, failed, wall and busy seconds, items per second
+        """
+        wall = (self.finished - self.started) if self.started is not None else 0.0
+        return {
+            "stage": self.name,
+            "processed": self.processed,
+            "failed": self.failed,
+            "wall_seconds": round(wall, 3),
+            "busy_seconds": round(self.busy, 3),
+            "throughput": round(self.processed / wall, 3) if wall else 0.0,
+        }
+
+def load_manifest(path):
+    """
+    Read the sources that already went through every stage
+
+    Returns:
+        set: Source paths with an image and no error
+    """
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("image_path") and not record.get("error"):
+                completed.add(record["source"])
+    return completed
+
+class Pipeline:
+    def __init__(self, transcriptor, painter, language="tr-TR", output_directory="recordings",
+                 queue_size=8, transcribe_workers=2, paint_workers=2, paint_params=None, history=None):
+        """
+        Audio folder -> transcripts -> images with concurrent, bounded stages
+
+        Ingestion, transcription and image generation run in their own threads
+        and are connected by bounded queues, so a slow stage makes the ones
+        before it wait instead of piling up work in memory. Overall speed is
+        that of the slowest stage.
+
+        Args:
+            transcriptor (Transcriptor): Transcriptor for the second stage
+            painter (StableDiffusionPainter): Painter for the last stage
+            language (str): Language code for transcription
+            output_directory (str): Directory ingested audio is written to
+            queue_size (int): Capacity of each queue between stages
+            transcribe_workers (int): Threads in the transcription stage
+            paint_workers (int): Threads in the image generation stage
+            paint_params (dict): Extra arguments for painter.paint()
+            history (HistoryStore): Finished items are also recorded here if given
+        """
+        self.transcriptor = transcriptor
+        self.painter = painter
+        self.language = language
+        self.output_directory = output_directory
+        self.queue_size = queue_size
+        self.transcribe_workers = transcribe_workers
+        self.paint_workers = paint_workers
+        self.paint_params = paint_params or {}
+        self.history = history
+        self.stats = {name: StageStats(name) for name in ("ingest", "transcribe", "paint")}
+
+    def _ingest(self, item):
+        item["audio_path"] = ingest_audio(item["source"], self.output_directory, prefix="batch")
+        return True
+
+    def _transcribe(self, item):
+        item["text"] = self.transcriptor.transcribe(item["audio_path"], language=self.language)
+        if item["text"]:
+            base = os.path.splitext(os.path.basename(item["audio_path"]))[0]
+            item["transcript_path"] = self.transcriptor.save_transcript(
+                item["text"], self.transcriptor.storage.path_for(f"{base}.txt")
+            )
+        return bool(item["text"])
+
+    def _paint(self, item):
+        item["image_path"] = self.painter.paint(prompt=item["text"], **self.paint_params)
+        return bool(item["image_path"])
+
+    def _stage(self, name, work, inbox, outbox, results, remaining):
+        """
+        Worker loop shared by all stages
+
+        Successful items move to `outbox`; failed ones go straight to `results`.
+        The last worker of a stage to see STOP forwards one STOP per worker of
+        the next stage.
+        """
+        next_workers = {"ingest": self.transcribe_workers, "transcribe": self.paint_workers}.get(name, 1)
+        while True:
+            item = inbox.get()
+            if item is STOP:
+                with remaining[name]["lock"]:
+                    remaining[name]["count"] -= 1
+                    last = remaining[name]["count"] == 0
+                if last:
+                    for _ in range(next_workers):
+                        outbox.put(STOP)
+                return
+
+            started = time.monotonic()
+            try:
+                ok = work(item)
+                if not ok:
+                    item["error"] = f"{name} sonuç üretmedi"
+            except Exception as e:
+                traceback.print_exc()
+                ok = False
+                item["error"] = f"{name}: {e}"
+            self.stats[name].record(started, ok)
+
+            if ok:
+                outbox.put(item)
+            else:
+                item["failed_stage"] = name
+                results.put(item)
+
+    def run(self, sources, manifest="transcripts/pipeline_manifest.jsonl"):
+        """
+        Push every source through the pipeline, skipping those already in the manifest
+
+        Args:
+            sources (list): Audio files or directories
+            manifest (str): JSONL file results are appended to and resumed from
+
+        Returns:
+            dict: Stage name -> summary from StageStats.summary()
+        """
+        completed = load_manifest(manifest)
+        pending = [path for path in _expand_audio_paths(sources, INGEST_EXTENSIONS) if path not in completed]
+        print(f"{len(pending)} dosya işlenecek, {len(completed)} dosya daha önce tamamlanmış")
+
+        to_ingest = queue.Queue(maxsize=self.queue_size)
+        to_transcribe = queue.Queue(maxsize=self.queue_size)
+        to_paint = queue.Queue(maxsize=self.queue_size)
+        results = queue.Queue()
+
+        remaining = {
+            name: {"count": count, "lock": threading.Lock()}
+            for name, count in (("ingest", 1), ("transcribe", self.transcribe_workers), ("paint", self.paint_workers))
+        }
+        stages = [
+            ("ingest", self._ingest, to_ingest, to_transcribe, 1),
+            ("transcribe", self._transcribe, to_transcribe, to_paint, self.transcribe_workers),
+            ("paint", self._paint, to_paint, results, self.paint_workers),
+        ]
+        threads = []
+        for name, work, inbox, outbox, workers in stages:
+            for _ in range(workers):
+                thread = threading.Thread(
+                    target=self._stage, args=(name, work, inbox, outbox, results, remaining), daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        def feed():
+            for path in pending:
+                to_ingest.put({"source": path, "audio_path": None, "text": None, "image_path": None, "error": None})
+            to_ingest.put(STOP)
+
+        threading.Thread(target=feed, daemon=True).start()
+
+        os.makedirs(os.path.dirname(manifest) or ".", exist_ok=True)
+        with open(manifest, "a", encoding="utf-8") as f:
+            finished = 0
+            while finished < len(pending):
+                item = results.get()
+                if item is STOP:
+                    continue
+                finished += 1
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                f.flush()
+                if self.history and item["image_path"]:
+                    self.history.add(
+                        item["text"],
+                        image_path=item["image_path"],
+                        audio_path=item["audio_path"],
+                        transcript_path=item.get("transcript_path"),
+                        language=self.language
+                    )
+                print(f"[{finished}/{len(pending)}] {item['source']}: {item['image_path'] or item['error']}")
+
+        for thread in threads:
+            thread.join()
+        return {name: stats.summary() for name, stats in self.stats.items()}
+
+def main(argv=None):
+    """
+    Komut satırı girişi / Command line entry point
+
+    Örnek / Example:
+        python pipeline.py audio_backlog/ --language tr-TR --paint-workers 4
+    """
+    parser = argparse.ArgumentParser(description="Ses klasörü -> metin -> görüntü toplu işleme")
+    parser.add_argument("paths", nargs="+", help="Ses dosyaları veya klasörler")
+    parser.add_argument("--language", default="tr-TR", help="Dil kodu")
+    parser.add_argument("--manifest", default="transcripts/pipeline_manifest.jsonl", help="Devam edilecek JSONL dosyası")
+    parser.add_argument("--queue-size", type=int, default=8, help="Aşamalar arası kuyruk kapasitesi")
+    parser.add_argument("--transcribe-workers", type=int, default=2, help="Transkripsiyon iş parçacığı sayısı")
+    parser.add_argument("--paint-workers", type=int, default=2, help="Görüntü oluşturma iş parçacığı sayısı")
+    parser.add_argument("--width", type=int, default=1024, help="Görüntü genişliği")
+    parser.add_argument("--height", type=int, default=1024, help="Görüntü yüksekliği")
+    parser.add_argument("--steps", type=int, default=30, help="Difüzyon adımı")
+    parser.add_argument("--metrics-port", type=int, help="Ölçümleri bu portta /metrics olarak yayınla")
+    parser.add_argument("--metrics-log", help="Her aşama süresini JSON satırı olarak yaz ('-' stderr)")
+    args = parser.parse_args(argv)
+
+    from transcriptor import Transcriptor
+    from painter import StableDiffusionPainter
+    from history import HistoryStore
+    from storage import start_janitor
+    import metrics
+    
+    if args.metrics_port is not None or args.metrics_log:
+        metrics.enable(json_log=args.metrics_log)
+    if args.metrics_port is not None:
+        _, url = metrics.serve(port=args.metrics_port)
+        print(f"Ölçümler: {url}/metrics")
+
+    pipeline = Pipeline(
+        Transcriptor(),
+        StableDiffusionPainter(pool_size=max(10, args.paint_workers)),
+        language=args.language,
+        queue_size=args.queue_size,
+        transcribe_workers=args.transcribe_workers,
+        paint_workers=args.paint_workers,
+        paint_params={"width": args.width, "height": args.height, "steps": args.steps},
+        history=HistoryStore(),
+    )
+    start_janitor()
+    summary = pipeline.run(args.paths, manifest=args.manifest)
+
+    print("Aşama          işlenen  hata   süre (sn)  meşgul (sn)  adet/sn")
+    for stage in summary.values():
+        print(f"{stage['stage']:<14} {stage['processed']:>7}  {stage['failed']:>4}  {stage['wall_seconds']:>9}  "
+              f"{stage['busy_seconds']:>11}  {stage['throughput']:>7}")
+    return 1 if any(stage["failed"] for stage in summary.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
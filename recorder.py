@@ -1,28 +1,677 @@
 import os
-import wave
-import tempfile
 import traceback
+import shutil
+import queue
 import numpy as np
-import sounddevice as sd
 import soundfile as sf
+try:
+    import sounddevice as sd
+except OSError as e:
+    # No PortAudio (e.g. headless servers): file ingestion still works, the microphone doesn't
+    sd = None
+    print(f"UYARI: sounddevice yüklenemedi, mikrofon kullanılamaz: {e}")
 import threading
 import time
-from datetime import datetime
+from storage import get_store
+import metrics
+from vad import VAD_FRAME_MS, _frame_length, frame_activity
+
+def trim_silence(audio, sample_rate, pad_ms=150, **vad_options):
+    """
+    Remove leading and trailing silence from a clip
+    
+    Args:
+        audio (np.ndarray): Samples of shape (frames,) or (frames, channels)
+        sample_rate (int): Sample rate of the audio
+        pad_ms (int): Silence kept before the first and after the last speech frame
+        **vad_options: Extra arguments for frame_activity()
+    
+    Returns:
+        np.ndarray: View of `audio` without the silent edges, or `audio` unchanged
+            if no speech was detected
+    """
+    frame_ms = vad_options.get("frame_ms", VAD_FRAME_MS)
+    active = np.flatnonzero(frame_activity(audio, sample_rate, **vad_options))
+    if active.size == 0:
+        return audio
+    
+    frame_len = _frame_length(sample_rate, frame_ms)
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, active[0] * frame_len - pad)
+    stop = min(len(audio), (active[-1] + 1) * frame_len + pad)
+    return audio[start:stop]
+
+# Ingested audio is normalized to what the recognizer needs
+TARGET_SAMPLE_RATE = 16000
+INGEST_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3", ".aif", ".aiff")
+INGEST_BLOCK_FRAMES = 64 * 1024
+RESAMPLE_TAPS = 63
+
+class Resampler:
+    def __init__(self, source_rate, target_rate=TARGET_SAMPLE_RATE, taps=RESAMPLE_TAPS):
+        """
+        Streaming sample rate converter for mono float blocks
+        
+        Downsampling first applies a windowed-sinc low-pass filter against
+        aliasing, then both directions use linear interpolation. Filter history
+        and the fractional read position carry over between blocks, so the
+        output doesn't depend on how the input was split.
+        
+        Args:
+            source_rate (int): Sample rate of the input
+            target_rate (int): Sample rate of the output
+            taps (int): Length of the anti-aliasing filter (odd)
+        """
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self._step = source_rate / target_rate
+        self._filter = None
+        if source_rate > target_rate:
+            cutoff = 0.45 * target_rate / source_rate
+            n = np.arange(taps) - (taps - 1) / 2
+            self._filter = (2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(taps)).astype(np.float32)
+            self._filter /= self._filter.sum()
+            self._history = np.zeros(taps - 1, dtype=np.float32)
+        # Start one group delay into the filtered signal so output lines up with input
+        self._delay = 0 if self._filter is None else (taps - 1) // 2
+        self._position = float(self._delay)
+        self._carry = np.zeros(0, dtype=np.float32)
+    
+    def process(self, block):
+        """
+        Resample the next block
+        
+        Args:
+            block (np.ndarray): Mono float samples
+        
+        Returns:
+            np.ndarray: Resampled float32 samples (may be empty)
+        """
+        block = np.asarray(block, dtype=np.float32)
+        if self.source_rate == self.target_rate:
+            return block
+        
+        if self._filter is not None:
+            padded = np.concatenate((self._history, block))
+            self._history = padded[len(padded) - len(self._history):]
+            block = np.convolve(padded, self._filter, mode="valid").astype(np.float32)
+        
+        buffer = np.concatenate((self._carry, block))
+        last = len(buffer) - 1
+        if last < self._position:
+            self._carry = buffer
+            return np.zeros(0, dtype=np.float32)
+        
+        count = int((last - self._position) // self._step) + 1
+        positions = self._position + self._step * np.arange(count)
+        index = positions.astype(np.int64)
+        fraction = (positions - index).astype(np.float32)
+        upper = np.minimum(index + 1, last)
+        output = buffer[index] * (1.0 - fraction) + buffer[upper] * fraction
+        
+        next_position = self._position + self._step * count
+        drop = min(int(next_position), last)
+        self._carry = buffer[drop:]
+        self._position = next_position - drop
+        return output
+    
+    def flush(self):
+        """
+        Return the samples still held back by the filter delay
+        """
+        if self._delay == 0:
+            return np.zeros(0, dtype=np.float32)
+        return self.process(np.zeros(self._delay, dtype=np.float32))
+
+class TrimmingWriter:
+    def __init__(self, output, pad_ms=150, max_lead_ms=None, **vad_options):
+        """
+        Write blocks to a SoundFile, dropping leading and trailing silence
+        
+        Audio before the first speech frame is dropped except for the last
+        `pad_ms`. After that, silent frames are held back until more speech
+        arrives, and finish() writes only `pad_ms` of whatever is still held.
+        Nothing is rewritten, so this works for compressed formats such as FLAC;
+        memory use is bounded by the longest pause, not the length of the audio.
+        
+        With `max_lead_ms`, audio before the first speech frame is held instead
+        of dropped until speech shows up. If it grows longer than that, it is
+        written untrimmed, and a clip without any speech is written unchanged,
+        like trim_silence() does.
+        
+        Args:
+            output (sf.SoundFile): Open mono file to write to
+            pad_ms (int): Silence kept around the speech
+            max_lead_ms (int): Longest lead to hold back (None drops it)
+            **vad_options: Extra arguments for frame_activity()
+        """
+        self.output = output
+        self.sample_rate = output.samplerate
+        self.vad_options = vad_options
+        self._frame_len = _frame_length(self.sample_rate, vad_options.get("frame_ms", VAD_FRAME_MS))
+        self._pad = int(self.sample_rate * pad_ms / 1000)
+        self._max_lead = None if max_lead_ms is None else int(self.sample_rate * max_lead_ms / 1000)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._held = []
+        self._speech_found = False
+        self._trimming_lead = True
+    
+    def _held_audio(self):
+        return np.concatenate(self._held) if self._held else np.zeros(0, dtype=np.float32)
+    
+    def write(self, block):
+        data = np.concatenate((self._pending, np.asarray(block, dtype=np.float32)))
+        usable = len(data) - len(data) % self._frame_len
+        analyzed, self._pending = data[:usable], data[usable:]
+        if usable == 0:
+            return
+        
+        active = np.flatnonzero(frame_activity(analyzed, self.sample_rate, **self.vad_options))
+        if active.size == 0:
+            self._held.append(analyzed)
+            if self._trimming_lead:
+                lead = self._held_audio()
+                if self._max_lead is None:
+                    # Before the first speech only the padding is worth keeping
+                    self._held = [lead[max(0, len(lead) - self._pad):]] if self._pad else []
+                elif len(lead) > self._max_lead:
+                    # Waited too long for speech: keep the lead as it is
+                    self.output.write(lead)
+                    self._held = []
+                    self._trimming_lead = False
+            return
+        
+        start = 0
+        held = self._held_audio()
+        if self._trimming_lead:
+            start = active[0] * self._frame_len
+            held = np.concatenate((held, analyzed[:start]))
+            held = held[max(0, len(held) - self._pad):] if self._pad else held[:0]
+            self._trimming_lead = False
+        self._speech_found = True
+        
+        end = (active[-1] + 1) * self._frame_len
+        self.output.write(held)
+        self.output.write(analyzed[start:end])
+        self._held = [analyzed[end:]]
+    
+    def finish(self):
+        """
+        Write the padding after the last speech frame
+        
+        Returns:
+            bool: False if no speech was found (only the last `pad_ms` was
+                written, or everything with `max_lead_ms`)
+        """
+        tail = np.concatenate((self._held_audio(), self._pending))
+        if not self._speech_found:
+            if self._max_lead is not None:
+                self.output.write(tail)
+            else:
+                self.output.write(tail[max(0, len(tail) - self._pad):] if self._pad else tail[:0])
+            return False
+        self.output.write(tail[:self._pad])
+        return True
+
+def _decode_blocks(source, blocksize=INGEST_BLOCK_FRAMES):
+    """
+    Open an audio source for block-wise decoding into mono float32
+    
+    soundfile (libsndfile) handles WAV/FLAC/OGG and, with libsndfile 1.1+, MP3
+    without decoding the whole file. Anything else goes through pydub/ffmpeg,
+    which decodes the file in one piece before it is split into blocks.
+    
+    Returns:
+        tuple: (sample_rate, iterator of mono np.ndarray blocks)
+    """
+    try:
+        audio_file = sf.SoundFile(source)
+    except Exception as e:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        from pydub import AudioSegment
+        segment = AudioSegment.from_file(source)
+        print(f"soundfile çözümleyemedi ({e}), pydub kullanılıyor")
+        
+        def segment_blocks():
+            samples = np.array(segment.get_array_of_samples()).reshape(-1, segment.channels)
+            scale = float(1 << (8 * segment.sample_width - 1))
+            for start in range(0, len(samples), blocksize):
+                yield samples[start:start + blocksize].mean(axis=1, dtype=np.float32) / scale
+        return segment.frame_rate, segment_blocks()
+    
+    def file_blocks():
+        with audio_file:
+            for block in audio_file.blocks(blocksize, dtype="float32", always_2d=True):
+                yield block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)
+    return audio_file.samplerate, file_blocks()
+
+def ingest_audio(source, output_directory="recordings", prefix="upload", trim=True, pad_ms=150,
+                 sample_rate=TARGET_SAMPLE_RATE, blocksize=INGEST_BLOCK_FRAMES):
+    """
+    Decode an audio file or stream into a 16-bit mono FLAC at the recognizer's sample rate
+    
+    The source is decoded, downmixed, resampled and trimmed block by block, so
+    it is never held in memory as a whole. The file is placed in the shared
+    artifact store of `output_directory`. Sources that can't be decoded are
+    copied unchanged.
+    
+    Args:
+        source: Path or binary file-like object (WAV, FLAC, OGG, MP3, ...)
+        output_directory (str): Directory to save the audio in
+        prefix (str): File name prefix
+        trim (bool): Remove leading and trailing silence
+        pad_ms (int): Silence kept around the speech when trimming
+        sample_rate (int): Sample rate of the saved file
+        blocksize (int): Frames decoded at a time
+    
+    Returns:
+        str: Path to the saved audio file
+    """
+    store = get_store(output_directory)
+    
+    try:
+        source_rate, blocks = _decode_blocks(source, blocksize)
+    except Exception as e:
+        print(f"Ses çözümlenemedi, olduğu gibi kaydediliyor: {e}")
+        name = getattr(source, "name", source)
+        extension = os.path.splitext(name)[1] if isinstance(name, str) else ""
+        filename = store.new_path(prefix, extension or ".wav")
+        if hasattr(source, "read"):
+            source.seek(0)
+            with open(filename, "wb") as f:
+                shutil.copyfileobj(source, f)
+        else:
+            shutil.copyfile(source, filename)
+        return filename
+    
+    filename = store.new_path(prefix, ".flac")
+    resampler = Resampler(source_rate, sample_rate)
+    with metrics.span("recorder.ingest", source_rate=source_rate), \
+            sf.SoundFile(filename, "w", samplerate=sample_rate, channels=1, format="FLAC", subtype="PCM_16") as output:
+        writer = TrimmingWriter(output, pad_ms=pad_ms) if trim else output
+        for block in blocks:
+            writer.write(resampler.process(block))
+        writer.write(resampler.flush())
+        speech_found = writer.finish() if trim else True
+    metrics.count("recorder_bytes_written_total", os.path.getsize(filename), kind="ingest")
+    
+    if not speech_found and (not hasattr(source, "seek") or source.seekable()):
+        # Like trim_silence(), keep audio without detected speech untrimmed
+        os.remove(filename)
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return ingest_audio(source, output_directory, prefix, trim=False,
+                            sample_rate=sample_rate, blocksize=blocksize)
+    return filename
+
+class RingBuffer:
+    def __init__(self, capacity, channels=1, dtype="float32"):
+        """
+        Fixed-size audio buffer backed by a single preallocated NumPy array
+        
+        Every block is written twice, at its position and at position + capacity,
+        so any window of up to `capacity` frames is contiguous and can be
+        returned as a view without copying.
+        
+        Args:
+            capacity (int): Number of frames kept in the buffer
+            channels (int): Number of audio channels
+            dtype (str): Sample type of the buffer
+        """
+        self.capacity = int(capacity)
+        self.channels = channels
+        self._data = np.zeros((2 * self.capacity, channels), dtype=dtype)
+        self._written = 0
+    
+    @property
+    def frames_written(self):
+        """
+        Total number of frames written since the buffer was created
+        """
+        return self._written
+    
+    def write(self, block):
+        """
+        Append a block of frames, overwriting the oldest frames when full
+        
+        Args:
+            block (np.ndarray): Array of shape (frames, channels)
+        """
+        frames = len(block)
+        if frames >= self.capacity:
+            # Only the newest `capacity` frames can be kept
+            self._written += frames - self.capacity
+            block = block[-self.capacity:]
+            frames = self.capacity
+        
+        start = self._written % self.capacity
+        first = min(frames, self.capacity - start)
+        for offset in (0, self.capacity):
+            self._data[offset + start:offset + start + first] = block[:first]
+            self._data[offset:offset + frames - first] = block[first:]
+        self._written += frames
+    
+    def view(self, start, stop=None):
+        """
+        Return the frames between two absolute positions as a zero-copy view
+        
+        Frames older than `capacity` are no longer available, so `start` is
+        clamped to the oldest frame still in the buffer. The view is only valid
+        until the writer wraps around to the same region.
+        
+        Args:
+            start (int): Absolute index of the first frame
+            stop (int): Absolute index after the last frame (defaults to now)
+        
+        Returns:
+            np.ndarray: View of shape (frames, channels)
+        """
+        written = self._written
+        stop = written if stop is None else min(stop, written)
+        start = max(start, written - self.capacity, 0)
+        if stop <= start:
+            return self._data[:0]
+        offset = start % self.capacity
+        return self._data[offset:offset + stop - start]
+    
+    def latest(self, frames):
+        """
+        Return the newest `frames` frames as a zero-copy view
+        """
+        return self.view(self._written - frames)
+
+class RecordingHandle:
+    def __init__(self, sample_rate, max_duration=None, callback=None):
+        """
+        Future-like handle for a single take
+        
+        Resolves to the exact path of the take's file as soon as it is written,
+        or to None if nothing could be recorded (or takes aren't saved). When the
+        recorder keeps takes in memory, the samples are available from audio()
+        before the file is finalized.
+        
+        Args:
+            sample_rate (int): Sample rate of the take
+            max_duration (float): Duration after which the take stops on its own
+            callback: Optional function called with the path when the handle resolves
+        """
+        self.sample_rate = sample_rate
+        self.max_duration = max_duration
+        self.frames = 0
+        self._callback = callback
+        self._started = time.monotonic()
+        self._stopped = None
+        self._path = None
+        self._samples = None
+        self._done = threading.Event()
+        self._audio_ready = threading.Event()
+    
+    def _add_frames(self, count):
+        self.frames += count
+        return self.max_duration is not None and self.frames >= self.max_duration * self.sample_rate
+    
+    def _mark_stopped(self):
+        if self._stopped is None:
+            self._stopped = time.monotonic()
+    
+    def _set_audio(self, samples):
+        self._samples = samples
+        self._audio_ready.set()
+    
+    def _resolve(self, path):
+        if self._done.is_set():
+            return
+        self._mark_stopped()
+        self._path = path
+        try:
+            if self._callback:
+                self._callback(path)
+        finally:
+            self._done.set()
+            self._audio_ready.set()
+    
+    def audio(self, timeout=None):
+        """
+        Block until the take's samples are in memory or the timeout expires
+        
+        Args:
+            timeout (float): Seconds to wait (None waits indefinitely)
+        
+        Returns:
+            np.ndarray: Trimmed 16-bit mono samples at `sample_rate`, or None if
+                the take isn't kept in memory or isn't finished (yet)
+        """
+        self._audio_ready.wait(timeout)
+        return self._samples
+    
+    def done(self):
+        """
+        Check without blocking whether the take's file has been written
+        
+        Returns:
+            bool: True once the handle is resolved
+        """
+        return self._done.is_set()
+    
+    def wait(self, timeout=None):
+        """
+        Block until the take's file is written or the timeout expires
+        
+        Args:
+            timeout (float): Seconds to wait (None waits indefinitely)
+        
+        Returns:
+            str: Path to the saved file, or None if it isn't available (yet)
+        """
+        self._done.wait(timeout)
+        return self._path
+    
+    @property
+    def path(self):
+        """
+        Path to the saved file, or None while the take is still in progress
+        """
+        return self._path
+    
+    def elapsed(self):
+        """
+        Seconds of audio captured so far
+        """
+        return self.frames / self.sample_rate
+    
+    def progress(self):
+        """
+        Non-blocking progress of the take
+        
+        Returns:
+            float: Fraction of max_duration captured (0.0-1.0), or 1.0 once the take
+                has stopped; None while recording without a max_duration
+        """
+        if self._stopped is not None:
+            return 1.0
+        if not self.max_duration:
+            return None
+        return min(1.0, self.elapsed() / self.max_duration)
+
+class _TakeSink:
+    def __init__(self, file, sample_rate, keep_audio):
+        """
+        Output of a take: its file, its 16-bit samples in memory, or both
+        """
+        self.file = file
+        self.samplerate = sample_rate
+        self.pcm = bytearray() if keep_audio else None
+    
+    def write(self, block):
+        if self.file is not None:
+            self.file.write(block)
+        if self.pcm is not None:
+            self.pcm += memoryview((np.clip(block, -1.0, 1.0) * 32767).astype("<i2")).cast("B")
+
+class TakeWriter:
+    def __init__(self, path, sample_rate, trim=True, pad_ms=150, max_lead_ms=30000,
+                 keep_audio=False, on_audio=None, on_done=None):
+        """
+        Write a take to a FLAC file block by block while it is being recorded
+        
+        The audio callback hands blocks over with put(), which only appends to
+        a SimpleQueue; a background thread encodes them into an open SoundFile.
+        close() lets the thread write what is left and finalize the header, so
+        stopping doesn't copy or encode the whole take and takes the same time
+        no matter how long the recording was.
+        
+        With `keep_audio` the written samples are also collected as 16-bit PCM
+        and handed to `on_audio` before the file is finalized, so a consumer such
+        as the transcriptor doesn't have to wait for the file or read it back.
+        
+        Args:
+            path (str): File to write, None to keep the take in memory only
+            sample_rate (int): Sample rate of the take
+            trim (bool): Drop leading and trailing silence (see TrimmingWriter)
+            pad_ms (int): Silence kept around the speech when trimming
+            max_lead_ms (int): Longest lead held back while waiting for speech
+            keep_audio (bool): Collect the samples in memory
+            on_audio: Optional function called with the samples (np.ndarray of
+                int16, a view of the collected buffer) once the take is complete
+            on_done: Optional function called with the path (None on error, if
+                nothing was recorded or without a path) once the file is complete
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self._on_audio = on_audio
+        self._on_done = on_done
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        if path is not None:
+            self._file = sf.SoundFile(path, "w", samplerate=sample_rate, channels=1, format="FLAC", subtype="PCM_16")
+        self._sink = _TakeSink(self._file, sample_rate, keep_audio or path is None)
+        self._writer = TrimmingWriter(self._sink, pad_ms=pad_ms, max_lead_ms=max_lead_ms) if trim else self._sink
+        self._thread = threading.Thread(target=self._run, name="take-writer", daemon=True)
+        self._thread.start()
+    
+    def put(self, block):
+        """
+        Queue a block of frames for writing; safe to call from the audio callback
+        
+        Args:
+            block (np.ndarray): Frames of shape (frames,) or (frames, 1), owned by
+                the writer from now on
+        """
+        self._queue.put(block)
+    
+    def close(self):
+        """
+        Finish the file once every queued block is written (doesn't block)
+        """
+        self._queue.put(None)
+    
+    def join(self, timeout=None):
+        """
+        Wait until the file is complete
+        """
+        self._thread.join(timeout)
+    
+    def _run(self):
+        path = self.path
+        try:
+            while True:
+                block = self._queue.get()
+                if block is None:
+                    break
+                block = block.reshape(-1)
+                self.frames += len(block)
+                self._writer.write(block)
+            if isinstance(self._writer, TrimmingWriter):
+                self._writer.finish()
+            
+            if self.frames == 0:
+                print("Kayıt verileri toplanamadı")
+            elif self._on_audio and self._sink.pcm is not None:
+                # Zero-copy view: the buffer isn't touched again
+                self._on_audio(np.frombuffer(self._sink.pcm, dtype="<i2"))
+            
+            if self._file is not None:
+                with metrics.span("recorder.finalize"):
+                    self._file.close()
+                if self.frames == 0:
+                    os.remove(path)
+                    path = None
+                else:
+                    metrics.count("recorder_bytes_written_total", os.path.getsize(path), kind="take")
+                    print(f"Kayıt şuraya kaydedildi: {path}")
+        except Exception as e:
+            print(f"Kayıt kaydedilirken hata: {e}")
+            traceback.print_exc()
+            path = None
+            try:
+                if self._file is not None:
+                    self._file.close()
+            except Exception:
+                pass
+        finally:
+            if self._on_done:
+                self._on_done(path)
 
 class Recorder:
-    def __init__(self, output_directory="recordings"):
+    def __init__(self, output_directory="recordings", buffer_seconds=30, pre_roll=0.5,
+                 blocksize=0, latency=None):
         """
         Initialize the recorder
         
+        Takes are written to disk while they are recorded (see TakeWriter), so
+        stopping only finalizes the file.
+        
         Args:
             output_directory (str): Directory to save recordings
+            buffer_seconds (float): Length of the ring buffer used in listening mode
+            pre_roll (float): Seconds of audio before start_recording() included in a take
+                while listening
+            blocksize (int): Frames per audio callback (0 lets PortAudio choose)
+            latency: Input latency in seconds, or "low"/"high" (None for the default)
         """
         self.output_directory = output_directory
+        self.storage = get_store(output_directory)
         self.channels = 1
         self.sample_rate = 16000
+        self.blocksize = blocksize
+        self.latency = latency
         self.recording = False
-        self.audio_data = []
         self.recording_thread = None
+        self._take_writer = None
+        
+        # Always-listening capture state
+        self.buffer_seconds = buffer_seconds
+        self.pre_roll = pre_roll
+        self.listening = False
+        self._stream = None
+        self._ring = None
+        self._take_start = None
+        self._handle = None
+        # Serializes the take handoff between the stream callback and start/stop_recording()
+        self._take_lock = threading.Lock()
+        # One recorder is shared by every app session: only one of them can start a take
+        self._start_lock = threading.Lock()
+        
+        # Voice activity detection: trim saved takes and optionally auto-stop
+        self.trim_takes = True
+        self.trim_pad_ms = 150
+        self.trim_max_lead_ms = 30000
+        
+        # Takes are kept in memory for the transcriptor (see RecordingHandle.audio());
+        # writing them to the recordings store is optional and happens in the background
+        self.keep_takes_in_memory = True
+        self.save_takes = True
+        self._silence_ms = None
+        self._heard_speech = False
+        self._trailing_silence = 0
+        
+        # Live segmentation: speech chunks split at short pauses for streaming consumers
+        self.segment_silence_ms = 400
+        self._on_segment = None
+        self._segment_speech = False
+        self._segment_start = None
         
         # Create output directory if it doesn't exist
         if not os.path.exists(output_directory):
@@ -39,55 +688,275 @@ class Recorder:
         except Exception as e:
             print(f"Ses cihazları kontrol edilirken hata: {e}")
     
-    def start_recording(self, callback=None):
+    def start_listening(self):
+        """
+        Open a persistent input stream that keeps filling the ring buffer
+        
+        While listening, takes started with start_recording() reuse this stream
+        instead of opening a new one and include `pre_roll` seconds of audio
+        captured before the call.
+        
+        Returns:
+            bool: True if the stream is open, False otherwise
+        """
+        if self.listening:
+            return True
+        
+        try:
+            self._ring = RingBuffer(int(self.buffer_seconds * self.sample_rate), self.channels)
+            
+            def audio_callback(indata, frame_count, time_info, status):
+                self._ring.write(indata)
+                with self._take_lock:
+                    # stop_recording() may run concurrently on another thread; once it
+                    # has closed the take, no more blocks may reach the writer
+                    if not self.recording:
+                        return
+                    
+                    writer = self._take_writer
+                    if self._take_start is not None:
+                        # First block of the take: hand over the pre-roll with it
+                        writer.put(self._ring.view(self._take_start).copy())
+                        self._take_start = None
+                    else:
+                        writer.put(indata.copy())
+                    full = self._handle._add_frames(len(indata))
+                    stop, split = self._track_activity(indata)
+                    if split:
+                        self._emit_segment(self._ring.view(self._segment_start).copy())
+                        self._segment_start = self._ring.frames_written
+                if stop:
+                    print("Sessizlik algılandı, kayıt otomatik durduruldu.")
+                if stop or full:
+                    self.stop_recording()
+            
+            with metrics.span("recorder.stream_open", mode="listening"):
+                self._stream = sd.InputStream(
+                    samplerate=self.sample_rate,
+                    channels=self.channels,
+                    blocksize=self.blocksize,
+                    latency=self.latency,
+                    callback=audio_callback
+                )
+                self._stream.start()
+            self.listening = True
+            print("Sürekli dinleme başlatıldı...")
+            return True
+        except Exception as e:
+            print(f"Dinlemeyi başlatırken hata: {e}")
+            traceback.print_exc()
+            self._stream = None
+            self._ring = None
+            return False
+    
+    def stop_listening(self):
+        """
+        Close the persistent input stream, finishing any take in progress first
+        """
+        if not self.listening:
+            return
+        
+        if self.recording:
+            self.stop_recording()
+        
+        try:
+            self._stream.stop()
+            self._stream.close()
+        except Exception as e:
+            print(f"Dinlemeyi durdururken hata: {e}")
+            traceback.print_exc()
+        finally:
+            self._stream = None
+            self.listening = False
+            print("Sürekli dinleme durduruldu.")
+    
+    def is_listening(self):
+        """
+        Check if the persistent input stream is open
+        
+        Returns:
+            bool: True if listening, False otherwise
+        """
+        return self.listening
+    
+    def _track_activity(self, block):
+        """
+        Update the voice activity counters with a new block of the current take
+        
+        Args:
+            block (np.ndarray): Frames delivered by the input stream
+        
+        Returns:
+            tuple: (stop, split) where `stop` is True once speech has been followed
+                by `silence_ms` of silence and `split` is True when the current
+                segment holds speech followed by `segment_silence_ms` of silence
+        """
+        if not self._silence_ms and not self._on_segment:
+            return False, False
+        
+        active = np.flatnonzero(frame_activity(block, self.sample_rate))
+        if active.size:
+            self._heard_speech = True
+            self._segment_speech = True
+            self._trailing_silence = len(block) - (active[-1] + 1) * _frame_length(self.sample_rate)
+        else:
+            self._trailing_silence += len(block)
+        
+        stop = bool(self._silence_ms) and self._heard_speech and \
+            self._trailing_silence >= self._silence_ms * self.sample_rate / 1000
+        split = self._on_segment is not None and self._segment_speech and \
+            self._trailing_silence >= self.segment_silence_ms * self.sample_rate / 1000
+        return stop, split
+    
+    def _emit_segment(self, segment):
+        """
+        Hand a finished speech segment to the on_segment callback
+        
+        Args:
+            segment (np.ndarray): Frames of the segment (owned by the receiver)
+        """
+        self._segment_speech = False
+        if self._on_segment and len(segment):
+            try:
+                self._on_segment(segment)
+            except Exception as e:
+                print(f"Kayıt parçası iletilirken hata: {e}")
+    
+    def _open_take(self, handle):
+        """
+        Open a new take: its file in the recordings store (if takes are saved)
+        and its in-memory buffer (if they are kept in memory)
+        
+        Args:
+            handle (RecordingHandle): Handle resolved with the file path (or None)
+        
+        Returns:
+            TakeWriter: Writer the audio callback feeds, or None if the file
+                couldn't be created (the handle is then resolved with None)
+        """
+        try:
+            # FLAC takes about half the space of PCM WAV
+            return TakeWriter(
+                self.storage.new_path("mic", ".flac") if self.save_takes else None,
+                self.sample_rate,
+                trim=self.trim_takes,
+                pad_ms=self.trim_pad_ms,
+                max_lead_ms=self.trim_max_lead_ms,
+                keep_audio=self.keep_takes_in_memory,
+                on_audio=handle._set_audio,
+                on_done=handle._resolve
+            )
+        except Exception as e:
+            print(f"Kayıt dosyası açılamadı: {e}")
+            traceback.print_exc()
+            handle._resolve(None)
+            return None
+    
+    def start_recording(self, callback=None, silence_ms=None, on_segment=None, max_duration=None):
         """
         Start recording audio from microphone
         
         Args:
             callback: Optional callback function to call when recording is complete
+            silence_ms (int): Stop automatically after this much silence following
+                speech (None to record until stop_recording() is called)
+            on_segment: Optional callback called from the audio thread with each
+                speech segment (np.ndarray) as soon as it ends in a pause, and with
+                the remainder when the take stops. It must not block.
+            max_duration (float): Stop automatically after this many seconds of audio
         
         Returns:
-            bool: True if recording started successfully, False otherwise
+            RecordingHandle: Handle that resolves to the take's file path, or False
+                if recording could not be started (e.g. another take is in progress)
         """
-        if self.recording:
-            print("Kayıt zaten devam ediyor...")
-            return True
+        if not self._start_lock.acquire(blocking=False):
+            print("Kayıt zaten başlatılıyor...")
+            return False
+        try:
+            if self.recording:
+                print("Kayıt zaten devam ediyor...")
+                return False
+            return self._start_take(callback, silence_ms, on_segment, max_duration)
+        finally:
+            self._start_lock.release()
+    
+    def _start_take(self, callback, silence_ms, on_segment, max_duration):
+        handle = RecordingHandle(self.sample_rate, max_duration, callback)
+        self._handle = handle
+        self._silence_ms = silence_ms
+        self._heard_speech = False
+        self._trailing_silence = 0
+        self._on_segment = on_segment
+        self._segment_speech = False
+        
+        writer = self._open_take(handle)
+        if writer is None:
+            return False
+        self._take_writer = writer
+        
+        if self.listening:
+            # The stream is already open: the take starts at a position in the ring
+            # buffer, and the callback hands the pre-roll over with its first block
+            pre_roll_frames = int(self.pre_roll * self.sample_rate)
+            with self._take_lock:
+                self._take_start = max(0, self._ring.frames_written - pre_roll_frames)
+                self._segment_start = self._take_start
+                self.recording = True
+            print("Kayıt başlatıldı...")
+            return handle
             
         try:
             self.recording = True
-            self.audio_data = []
             
             # Start a recording thread
             def record_thread():
-                frames = []
+                # Only the blocks of the current speech segment are kept in memory
+                segment = []
                 
                 def audio_callback(indata, frame_count, time_info, status):
                     if self.recording:
-                        frames.append(indata.copy())
+                        block = indata.copy()
+                        writer.put(block)
+                        if self._on_segment:
+                            segment.append(block)
+                        full = handle._add_frames(len(indata))
+                        stop, split = self._track_activity(indata)
+                        if split:
+                            self._emit_segment(np.concatenate(segment, axis=0))
+                            segment.clear()
+                        if stop:
+                            print("Sessizlik algılandı, kayıt otomatik durduruldu.")
+                        if stop or full:
+                            self.recording = False
                 
-                with sd.InputStream(
-                    samplerate=self.sample_rate,
-                    channels=self.channels,
-                    callback=audio_callback
-                ):
-                    while self.recording:
-                        sd.sleep(100)  # Sleep for 100ms to reduce CPU usage
-                        
-                # Save the recording when finished
-                if frames:
-                    audio_array = np.concatenate(frames, axis=0)
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = os.path.join(self.output_directory, f"mic_{timestamp}.wav")
-                    sf.write(filename, audio_array, self.sample_rate)
-                    print(f"Kayıt şuraya kaydedildi: {filename}")
-                    if callback:
-                        callback(filename)
-                    return filename
-                else:
-                    print("Kayıt verileri toplanamadı")
-                    if callback:
-                        callback(None)
-                    return None
+                try:
+                    with metrics.span("recorder.stream_open", mode="take"):
+                        stream = sd.InputStream(
+                            samplerate=self.sample_rate,
+                            channels=self.channels,
+                            blocksize=self.blocksize,
+                            latency=self.latency,
+                            callback=audio_callback
+                        )
+                        stream.start()
+                    try:
+                        while self.recording:
+                            sd.sleep(100)  # Sleep for 100ms to reduce CPU usage
+                    finally:
+                        stream.close()
+                except Exception as e:
+                    print(f"Kayıt akışında hata: {e}")
+                    traceback.print_exc()
+                    self.recording = False
+                handle._mark_stopped()
+                
+                # Hand over the last segment before the writer can resolve the handle,
+                # whose callback tells streaming consumers that the take is over
+                if self._segment_speech and segment:
+                    self._emit_segment(np.concatenate(segment, axis=0))
+                
+                # The stream is closed, so every block is queued: finish the file
+                writer.close()
             
             # Start the recording thread
             self.recording_thread = threading.Thread(target=record_thread)
@@ -95,19 +964,22 @@ class Recorder:
             self.recording_thread.start()
             
             print("Kayıt başlatıldı...")
-            return True
+            return handle
         except Exception as e:
             print(f"Kaydı başlatırken hata: {e}")
             traceback.print_exc()
             self.recording = False
+            writer.close()
             return False
     
-    def record_audio(self, max_duration=5):
+    def record_audio(self, max_duration=5, silence_ms=800):
         """
         Record audio for a specific duration
         
         Args:
             max_duration (int): Maximum recording duration in seconds
+            silence_ms (int): Stop early after this much silence following speech
+                (None to always record the full duration)
         
         Returns:
             str: Path to the saved audio file
@@ -115,25 +987,15 @@ class Recorder:
         try:
             print(f"Maksimum {max_duration} saniye kaydediliyor...")
             
-            # Create a result container
-            result = {"filename": None}
-            recording_finished = threading.Event()
-            
-            def recording_done(filename):
-                result["filename"] = filename
-                recording_finished.set()
-            
-            # Start recording
-            if not self.start_recording(callback=recording_done):
+            # Start recording; the take stops itself on silence or after max_duration
+            handle = self.start_recording(silence_ms=silence_ms, max_duration=max_duration)
+            if not handle:
                 return None
-                
-            # Wait for specified duration then stop
-            time.sleep(max_duration)
-            self.stop_recording()
             
-            # Wait for recording to finish saving (timeout after 2 seconds)
-            recording_finished.wait(timeout=2)
-            return result["filename"]
+            # Safety net in case the stream delivers fewer frames than expected
+            if handle.wait(timeout=max_duration + 2) is None and not handle.done():
+                self.stop_recording(handle)
+            return handle.wait(timeout=2)
             
         except Exception as e:
             print(f"Kayıt sırasında hata: {e}")
@@ -141,28 +1003,46 @@ class Recorder:
             self.recording = False
             return None
     
-    def stop_recording(self):
+    def stop_recording(self, handle=None):
         """
         Stop recording and save the audio file
         
+        Args:
+            handle (RecordingHandle): Only stop if this is the take in progress
+                (None stops whatever is recording)
+        
         Returns:
-            None: The recording thread will handle the file saving
+            RecordingHandle: Handle of the stopped take; the writer thread
+                resolves it once the file is finalized (None if nothing was recording)
         """
-        if not self.recording:
-            return None
-        
-        try:
-            # Signal to stop the ongoing recording
-            self.recording = False
-            print("Kayıt durduruldu.")
+        with self._take_lock:
+            if not self.recording or (handle is not None and handle is not self._handle):
+                return None
             
-            # We don't join the thread here to avoid blocking
-            # The thread will finish processing and save the file
-            return None
-        except Exception as e:
-            print(f"Kaydı durdururken hata: {e}")
-            traceback.print_exc()
-            return None
+            handle = self._handle
+            try:
+                # Signal to stop the ongoing recording
+                self.recording = False
+                handle._mark_stopped()
+                print("Kayıt durduruldu.")
+                
+                if self.listening:
+                    take_end = self._ring.frames_written
+                    if self._take_start is not None:
+                        # Stopped before the callback saw the take: only the pre-roll exists
+                        self._take_writer.put(self._ring.view(self._take_start, take_end).copy())
+                        self._take_start = None
+                    if self._segment_speech:
+                        self._emit_segment(self._ring.view(self._segment_start, take_end).copy())
+                    self._take_writer.close()
+                
+                # Outside listening mode the recording thread closes the writer once
+                # its stream is closed; nothing here waits for the file
+                return handle
+            except Exception as e:
+                print(f"Kaydı durdururken hata: {e}")
+                traceback.print_exc()
+                return handle
     
     def is_recording(self):
         """
@@ -173,12 +1053,13 @@ class Recorder:
         """
         return self.recording
     
-    def save_uploaded_audio(self, uploaded_file):
+    def save_uploaded_audio(self, uploaded_file, trim=True):
         """
-        Save an uploaded audio file
+        Save an uploaded audio file as 16 kHz mono FLAC
         
         Args:
-            uploaded_file: Streamlit UploadedFile object
+            uploaded_file: Streamlit UploadedFile object (WAV, FLAC, OGG or MP3)
+            trim (bool): Remove leading and trailing silence before saving
             
         Returns:
             str: Path to the saved audio file
@@ -187,14 +1068,11 @@ class Recorder:
             return None
         
         try:
-            # Generate a filename based on timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join(self.output_directory, f"upload_{timestamp}.wav")
-            
-            # Save the uploaded file
-            with open(filename, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
+            uploaded_file.seek(0)
+            filename = ingest_audio(
+                uploaded_file, self.output_directory,
+                prefix="upload", trim=trim, pad_ms=self.trim_pad_ms
+            )
             print(f"Yüklenen ses dosyası şuraya kaydedildi: {filename}")
             return filename
         except Exception as e:
@@ -207,13 +1085,10 @@ if __name__ == "__main__":
     try:
         recorder = Recorder()
         print("Kayıt başlatılıyor...")
-        recorder.start_recording()
+        handle = recorder.start_recording(max_duration=5)
         print("5 saniye kayıt yapılıyor...")
-        time.sleep(5)
-        recorder.stop_recording()
-        # Bekleyin ki kayıt dosyaya kaydedilebilsin
-        time.sleep(1)
-        print("Kayıt tamamlandı")
+        # Kayıt dosyaya yazılır yazılmaz dosya yolu döner
+        print(f"Kayıt tamamlandı: {handle.wait()}")
     except KeyboardInterrupt:
         print("Kullanıcı kaydı durdurdu")
     except Exception as e:
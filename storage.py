@@ -0,0 +1,244 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
+import traceback
+from datetime import datetime
+
+# Default budgets per artifact directory: (max_bytes, max_age_days); None means unlimited.
+# Override with STORAGE_<NAME>_MAX_MB / STORAGE_<NAME>_MAX_DAYS, e.g. STORAGE_IMAGES_MAX_MB=2048
+DEFAULT_BUDGETS = {
+    "recordings": (1024 * 1024 * 1024, 30),
+    "transcripts": (64 * 1024 * 1024, None),
+    "images": (2048 * 1024 * 1024, 90),
+}
+
+JANITOR_INTERVAL = 600
+
+# Files still being written (see painter._stream_to_file) are only removed once this old
+PARTIAL_GRACE_SECONDS = 3600
+
+def _env_budget(name, max_bytes, max_age_days):
+    prefix = f"STORAGE_{os.path.basename(os.path.normpath(name)).upper()}"
+    if os.getenv(f"{prefix}_MAX_MB"):
+        max_bytes = int(float(os.environ[f"{prefix}_MAX_MB"]) * 1024 * 1024) or None
+    if os.getenv(f"{prefix}_MAX_DAYS"):
+        max_age_days = float(os.environ[f"{prefix}_MAX_DAYS"]) or None
+    return max_bytes, max_age_days
+
+class ArtifactStore:
+    def __init__(self, root, max_bytes=None, max_age_days=None, shard_depth=1):
+        """
+        Directory of generated files with sharding, retention and a byte budget
+
+        Files are placed in subdirectories named after a hash of the file name
+        (e.g. images/3f/image_....png), so no single directory grows large. One
+        level (256 directories) suits the default budgets; with two (65,536)
+        almost every file would get directories of its own for sweep() to walk.
+        sweep() deletes files older than `max_age_days` and then the least
+        recently used files until the directory fits in `max_bytes`. Recency is
+        the modification time, which touch() refreshes when a file is reused.
+        Hidden entries (names starting with ".") such as cache indexes are never
+        touched.
+
+        Args:
+            root (str): Directory of the store
+            max_bytes (int): Byte budget, None for unlimited
+            max_age_days (float): Maximum age of a file, None for unlimited
+            shard_depth (int): Levels of hashed subdirectories, 256 per level
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.shard_depth = shard_depth
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, name):
+        """
+        Return the sharded path for a file name, creating its directory
+
+        Args:
+            name (str): File name without directories
+
+        Returns:
+            str: Path inside the store
+        """
+        digest = hashlib.md5(name.encode("utf-8")).hexdigest()
+        shards = [digest[2 * level:2 * level + 2] for level in range(self.shard_depth)]
+        directory = os.path.join(self.root, *shards)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    def new_path(self, prefix, extension):
+        """
+        Return a sharded path for a new timestamped file
+
+        Args:
+            prefix (str): File name prefix, e.g. "mic"
+            extension (str): File extension including the dot, e.g. ".flac"
+
+        Returns:
+            str: Path inside the store
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return self.path_for(f"{prefix}_{timestamp}_{uuid.uuid4().hex[:6]}{extension}")
+
+    def touch(self, path):
+        """
+        Mark a file as recently used so eviction keeps it longer
+        """
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _files(self):
+        for directory, subdirectories, files in os.walk(self.root):
+            subdirectories[:] = [d for d in subdirectories if not d.startswith(".")]
+            for name in files:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, name, stat
+
+    def usage(self):
+        """
+        Returns:
+            dict: Number of files and bytes in the store
+        """
+        files, size = 0, 0
+        for _, _, stat in self._files():
+            files += 1
+            size += stat.st_size
+        return {"files": files, "bytes": size}
+
+    def sweep(self):
+        """
+        Enforce the age and byte budgets
+
+        Returns:
+            dict: Number of files and bytes removed
+        """
+        now = time.time()
+        max_age = self.max_age_days * 86400 if self.max_age_days else None
+        removed, freed = 0, 0
+        with self._lock:
+            entries = []
+            for path, name, stat in self._files():
+                partial = name.endswith((".part", ".tmp"))
+                age = now - stat.st_mtime
+                if (max_age and age > max_age) or (partial and age > PARTIAL_GRACE_SECONDS):
+                    if self._remove(path):
+                        removed += 1
+                        freed += stat.st_size
+                elif not partial:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            if self.max_bytes is not None and total > self.max_bytes:
+                # Least recently used first
+                for _, size, path in sorted(entries):
+                    if total <= self.max_bytes:
+                        break
+                    if self._remove(path):
+                        removed += 1
+                        freed += size
+                        total -= size
+
+            self._prune_directories()
+        if removed:
+            print(f"{self.root}: {removed} dosya silindi ({freed / 1024 / 1024:.1f} MB)")
+        return {"removed": removed, "bytes": freed}
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _prune_directories(self):
+        for directory, subdirectories, files in os.walk(self.root, topdown=False):
+            if directory != self.root and not os.path.basename(directory).startswith(".") and not subdirectories and not files:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+
+# One store per directory, shared by the recorder, transcriptor and painter
+_stores = {}
+_stores_lock = threading.Lock()
+_janitor = None
+
+def get_store(root, max_bytes=None, max_age_days=None):
+    """
+    Return the shared store for a directory, creating it on first use
+
+    Budgets default to DEFAULT_BUDGETS (by directory name) and the
+    STORAGE_<NAME>_MAX_MB / STORAGE_<NAME>_MAX_DAYS environment variables.
+
+    Args:
+        root (str): Directory of the store
+        max_bytes (int): Byte budget, overrides the defaults
+        max_age_days (float): Maximum file age, overrides the defaults
+
+    Returns:
+        ArtifactStore: Shared store
+    """
+    key = os.path.abspath(root)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            default_bytes, default_days = _env_budget(
+                root, *DEFAULT_BUDGETS.get(os.path.basename(key), (None, None))
+            )
+            store = ArtifactStore(
+                root,
+                max_bytes=max_bytes if max_bytes is not None else default_bytes,
+                max_age_days=max_age_days if max_age_days is not None else default_days,
+            )
+            _stores[key] = store
+        return store
+
+def sweep_all():
+    """
+    Sweep every store created so far
+    """
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        try:
+            store.sweep()
+        except Exception as e:
+            print(f"Depolama temizliği başarısız ({store.root}): {e}")
+            traceback.print_exc()
+
+def start_janitor(interval=JANITOR_INTERVAL):
+    """
+    Sweep all stores in a background thread every `interval` seconds
+
+    Calling it again while the janitor is running has no effect.
+
+    Returns:
+        threading.Event: Set it to stop the janitor
+    """
+    global _janitor
+    with _stores_lock:
+        if _janitor is not None and not _janitor.is_set():
+            return _janitor
+        stop = threading.Event()
+        _janitor = stop
+
+    def run():
+        while not stop.is_set():
+            sweep_all()
+            stop.wait(interval)
+
+    threading.Thread(target=run, name="storage-janitor", daemon=True).start()
+    return stop
@@ -0,0 +1,46 @@
+"""
+Smoke test of the local diffusion backend with a tiny random pipeline
+
+Skipped unless the optional local dependencies (requirements-local.txt) are installed.
+
+Usage:
+    python -m pytest tests/test_local_backend.py
+"""
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("diffusers")
+pytest.importorskip("transformers")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from painter import LocalDiffusionBackend, StableDiffusionPainter, build_tiny_pipeline
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    return build_tiny_pipeline(str(tmp_path_factory.mktemp("tiny_pipeline")))
+
+
+def test_tiny_preset_runs_sd_turbo_settings(tiny_model):
+    backend = LocalDiffusionBackend(model_id=tiny_model, preset="tiny")
+    assert backend.guidance_scale == 0.0
+    assert backend.resolve(512, 512, 30) == (64, 64, 1)
+
+
+def test_paint_and_paint_batch(tiny_model, tmp_path):
+    painter = StableDiffusionPainter(output_directory=str(tmp_path), backend="local", model_id=tiny_model, preset="tiny")
+    assert isinstance(painter.backend, LocalDiffusionBackend)
+    
+    image_path = painter.paint("a red boat", width=512, height=512, seed=1)
+    assert image_path and os.path.isfile(image_path)
+    
+    paths = painter.paint_batch(["a red boat", "a green tree"], width=512, height=512, seed=1)
+    assert len(paths) == 2
+    assert all(path and os.path.isfile(path) for path in paths)
+    # The first prompt was already painted with the same settings
+    assert paths[0] == image_path
@@ -1,50 +1,545 @@
 import os
+import sys
+import json
+import time
+import queue
+import random
+import hashlib
+import argparse
+import threading
 import traceback
+import urllib.error
+import urllib.parse
+import urllib.request
+import numpy as np
+import soundfile as sf
 import speech_recognition as sr
-from datetime import datetime
+from difflib import SequenceMatcher
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from storage import get_store
+from vad import frame_activity, _frame_length, VAD_FRAME_MS
+import metrics
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".aif", ".aiff")
+
+# Uzun ses parçalara bölünerek paralel tanınır / Long audio is recognized in parallel segments
+LONG_FORM_SEGMENT_SECONDS = 30.0
+LONG_FORM_OVERLAP_SECONDS = 1.5
+LONG_FORM_WORKERS = 8
+
+# Words compared at each seam when stitching segment transcripts
+STITCH_WINDOW_WORDS = 12
+
+def _expand_audio_paths(paths, extensions=AUDIO_EXTENSIONS):
+    """
+    Dosya ve klasör listesini ses dosyası listesine açar / Expands files and directories into audio files
+    """
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                expanded.extend(
+                    os.path.join(root, f) for f in sorted(files) if f.lower().endswith(extensions)
+                )
+        else:
+            expanded.append(path)
+    return expanded
+
+def _to_audio_data(samples, sample_rate):
+    """
+    Float samples in [-1, 1] -> 16-bit mono sr.AudioData / float örneklerden AudioData
+    """
+    samples = np.asarray(samples)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    return sr.AudioData(pcm.tobytes(), sample_rate, 2)
+
+def _longest_pause(active, start, stop):
+    """
+    Middle frame of the longest silent run in active[start:stop], or None if there is none
+    """
+    window = np.concatenate(([True], active[start:stop], [True])).astype(np.int8)
+    edges = np.diff(window)
+    run_starts, run_ends = np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)
+    if run_starts.size == 0:
+        return None
+    lengths = run_ends - run_starts
+    # The latest of equally long pauses keeps segments close to the maximum length
+    longest = np.flatnonzero(lengths == lengths.max())[-1]
+    return start + (run_starts[longest] + run_ends[longest]) // 2
+
+def plan_segments(samples, sample_rate, max_seconds=LONG_FORM_SEGMENT_SECONDS,
+                  overlap_seconds=LONG_FORM_OVERLAP_SECONDS, frame_ms=VAD_FRAME_MS):
+    """
+    Sesi sessizliklerden bölünmüş, örtüşen parçalara ayırır / Splits audio into overlapping segments at pauses
+    
+    Each segment is at most `max_seconds` long and ends in the middle of the
+    longest pause in its second half (or at the limit if there is no pause).
+    The next segment starts `overlap_seconds` before that cut, so a word at
+    the seam is heard whole by at least one segment.
+    
+    Args:
+        samples (np.ndarray): Mono samples
+        sample_rate (int): Sample rate of the audio
+        max_seconds (float): Longest segment
+        overlap_seconds (float): Audio shared by neighbouring segments
+        frame_ms (int): Frame length of the voice activity detector
+    
+    Returns:
+        list: (start, stop) sample indices of each segment
+    """
+    total = len(samples)
+    max_len = int(max_seconds * sample_rate)
+    if total <= max_len:
+        return [(0, total)]
+    # The overlap must leave every segment some new audio
+    overlap = min(int(overlap_seconds * sample_rate), max_len // 4)
+    frame_len = _frame_length(sample_rate, frame_ms)
+    active = frame_activity(samples, sample_rate, frame_ms)
+    
+    segments, start = [], 0
+    while total - start > max_len:
+        limit = start + max_len
+        pause = _longest_pause(active, -(-(start + max_len // 2) // frame_len), limit // frame_len)
+        cut = limit if pause is None else int(pause) * frame_len
+        segments.append((start, cut))
+        start = cut - overlap
+    segments.append((start, total))
+    return segments
+
+def _stitch_key(word):
+    return word.strip(".,;:!?\"'()«»").lower()
+
+def stitch_transcripts(texts, window=STITCH_WINDOW_WORDS):
+    """
+    Örtüşen parça metinlerini tekrarsız birleştirir / Joins transcripts of overlapping segments without repeats
+    
+    At each seam the last `window` words so far are aligned with the first
+    `window` words of the next segment. When they share a run of words (two or
+    more, or one at most a word away from the seam), the text before the run
+    comes from the earlier segment and the rest from the later one; words cut
+    off by a segment edge around the run are dropped.
+    
+    Args:
+        texts (list): Segment transcripts in order ("" for segments without speech)
+        window (int): Words compared at each seam
+    
+    Returns:
+        str: Stitched transcript
+    """
+    words = []
+    for text in texts:
+        new = (text or "").split()
+        if not new:
+            continue
+        if words:
+            tail, head = words[-window:], new[:window]
+            match = SequenceMatcher(
+                None, [_stitch_key(w) for w in tail], [_stitch_key(w) for w in head], autojunk=False
+            ).find_longest_match(0, len(tail), 0, len(head))
+            # Words between the run and the seam, e.g. a word garbled by the cut
+            slack = len(tail) - (match.a + match.size) + match.b
+            if match.size >= 2 or (match.size == 1 and slack <= 1):
+                del words[len(words) - len(tail) + match.a:]
+                new = new[match.b:]
+        words.extend(new)
+    return " ".join(words)
+
+def _as_audio_data(audio, sample_rate=None):
+    """
+    Bellekteki sesi AudioData'ya sarar / Wraps in-memory audio as sr.AudioData
+    
+    16-bit mono input (an int16 array or a PCM buffer) is wrapped without
+    copying; float arrays are converted like _to_audio_data().
+    
+    Args:
+        audio: sr.AudioData, np.ndarray (int16 or float in [-1, 1], mono or
+            (frames, channels)) or bytes-like 16-bit little-endian mono PCM
+        sample_rate (int): Örnekleme hızı / Sample rate (not needed for sr.AudioData)
+    
+    Raises:
+        ValueError: Örnekleme hızı eksik / Sample rate missing
+    """
+    if isinstance(audio, sr.AudioData):
+        return audio
+    if not sample_rate:
+        raise ValueError("Bellekteki ses için örnekleme hızı gerekli / sample_rate is required for in-memory audio")
+    if isinstance(audio, np.ndarray):
+        if audio.dtype != np.int16:
+            return _to_audio_data(audio, sample_rate)
+        if audio.ndim > 1:
+            audio = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1).astype(np.int16)
+        audio = np.ascontiguousarray(audio)
+    return sr.AudioData(memoryview(audio).cast("B"), sample_rate, 2)
+
+# Registry of recognizer engines by name
+RECOGNIZER_BACKENDS = {}
+
+def register_backend(name):
+    """
+    Tanıma motorunu kayıt defterine ekleyen dekoratör / Decorator that registers a recognizer backend
+    """
+    def decorator(cls):
+        cls.name = name
+        RECOGNIZER_BACKENDS[name] = cls
+        return cls
+    return decorator
+
+def create_backend(name, **options):
+    """
+    Adı verilen tanıma motorunu oluşturur / Creates a registered backend by name
+    
+    Raises:
+        ValueError: Bilinmeyen motor adı / Unknown backend name
+    """
+    if name not in RECOGNIZER_BACKENDS:
+        raise ValueError(f"Bilinmeyen tanıma motoru: {name} / Unknown recognizer backend: {name}")
+    return RECOGNIZER_BACKENDS[name](**options)
+
+class RecognizerBackend:
+    """
+    Tanıma motorları için temel sınıf / Base class for recognizer engines
+    
+    Backends raise sr.UnknownValueError when no speech is recognized and
+    sr.RequestError when the engine can't be reached, like SpeechRecognition does.
+    """
+    name = None
+    
+    def recognize(self, audio_data, language):
+        """
+        Args:
+            audio_data (sr.AudioData): Tanınacak ses / Audio to recognize
+            language (str): Dil kodu / Language code
+            
+        Returns:
+            str: Tanınan metin / Recognized text
+        """
+        raise NotImplementedError
+
+@register_backend("google")
+class GoogleBackend(RecognizerBackend):
+    def __init__(self, recognizer=None):
+        """
+        Google Speech Recognition API / Google Speech Recognition API
+        """
+        self.recognizer = recognizer or sr.Recognizer()
+    
+    def recognize(self, audio_data, language):
+        return self.recognizer.recognize_google(audio_data, language=language)
+
+@register_backend("stub")
+class StubBackend(RecognizerBackend):
+    def __init__(self, text="stub transcript", latency=0.0, jitter=0.0, error_rate=0.0,
+                 unknown_rate=0.0, url=None, timeout=10.0, seed=None):
+        """
+        Yerel test motoru / Local stand-in engine for offline benchmarks and tests
+        
+        In-process it sleeps for `latency` ± `jitter` seconds and then returns
+        `text`, or fails with the configured probabilities. With `url` set it sends
+        the audio to a server started by serve_stub() instead, so the full HTTP
+        path is exercised.
+        
+        Args:
+            text (str): Döndürülecek metin / Text to return
+            latency (float): Ortalama gecikme (saniye) / Mean latency in seconds
+            jitter (float): Gecikmeye eklenen rastgele sapma / Uniform jitter added to the latency
+            error_rate (float): RequestError olasılığı / Probability of sr.RequestError
+            unknown_rate (float): UnknownValueError olasılığı / Probability of sr.UnknownValueError
+            url (str): Stub sunucu adresi / Address of a stub server (defaults to STUB_RECOGNIZER_URL)
+            timeout (float): HTTP zaman aşımı / HTTP timeout in seconds
+            seed (int): Rastgelelik tohumu / Seed for reproducible runs
+        """
+        self.text = text
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.unknown_rate = unknown_rate
+        self.url = url or os.getenv("STUB_RECOGNIZER_URL")
+        self.timeout = timeout
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+    
+    def simulate(self):
+        """
+        Yapılandırılan gecikme ve hataları uygular / Applies the configured latency and failures
+        """
+        with self._random_lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            roll = self._random.random()
+        time.sleep(delay)
+        if roll < self.error_rate:
+            raise sr.RequestError("stub: simulated service error")
+        if roll < self.error_rate + self.unknown_rate:
+            raise sr.UnknownValueError()
+        return self.text
+    
+    def recognize(self, audio_data, language):
+        if not self.url:
+            return self.simulate()
+        
+        query = urllib.parse.urlencode({"language": language})
+        request = urllib.request.Request(
+            f"{self.url.rstrip('/')}/recognize?{query}",
+            data=audio_data.get_wav_data(),
+            headers={"Content-Type": "audio/wav"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())["text"]
+        except urllib.error.HTTPError as e:
+            if e.code == 422:
+                raise sr.UnknownValueError()
+            raise sr.RequestError(f"stub: HTTP {e.code}")
+        except (urllib.error.URLError, OSError) as e:
+            raise sr.RequestError(f"stub: {e}")
+
+def serve_stub(host="127.0.0.1", port=0, **options):
+    """
+    StubBackend'i küçük bir HTTP sunucusu olarak başlatır / Serves a StubBackend over HTTP
+    
+    POST /recognize with a WAV body answers 200 {"text": ...}, 422 when no speech
+    is "recognized" and 503 on a simulated service error.
+    
+    Args:
+        host (str): Dinlenecek adres / Bind address
+        port (int): Port (0 ise rastgele boş port) / Port, 0 picks a free one
+        **options: StubBackend seçenekleri / StubBackend options (latency, jitter, ...)
+        
+    Returns:
+        tuple: (server, url) - sunucu arka planda çalışır, server.shutdown() ile durdurulur /
+            the server runs in a daemon thread until server.shutdown()
+    """
+    options.pop("url", None)
+    engine = StubBackend(**options)
+    
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                status, body = 200, {"text": engine.simulate()}
+            except sr.UnknownValueError:
+                status, body = 422, {"error": "unknown_value"}
+            except sr.RequestError as e:
+                status, body = 503, {"error": str(e)}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+class TranscriptCache:
+    def __init__(self, memory_entries=256, directory="transcripts/.cache", max_bytes=16 * 1024 * 1024):
+        """
+        İki katmanlı transkript önbelleği / Two-tier transcript cache
+        
+        An in-process LRU sits in front of an on-disk store of small JSON files.
+        The disk store evicts least recently used entries once it grows past
+        `max_bytes`. Keys are built from the decoded PCM samples, so the same audio
+        hits the cache regardless of file name or container.
+        
+        Args:
+            memory_entries (int): Bellekte tutulacak kayıt sayısı / Entries kept in memory
+            directory (str): Disk önbelleği klasörü / Disk store directory (None to disable)
+            max_bytes (int): Disk önbelleği boyut sınırı / Size budget of the disk store
+        """
+        self.memory_entries = memory_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(audio_data, language, backend):
+        """
+        Ses örnekleri, dil ve motordan önbellek anahtarı üretir / Builds a cache key
+        
+        Args:
+            audio_data (sr.AudioData): Çözümlenmiş ses / Decoded audio
+            language (str): Dil kodu / Language code
+            backend (str): Tanıma motoru adı / Recognizer backend name
+            
+        Returns:
+            str: Hex anahtar / Hex digest
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{audio_data.sample_rate}:{audio_data.sample_width}:{language}:{backend}:".encode())
+        digest.update(audio_data.frame_data)
+        return digest.hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+    
+    def get(self, key):
+        """
+        Önbellekteki transkripti döndürür / Returns the cached transcript or None
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+        
+        if self.directory:
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = json.load(f)["text"]
+                os.utime(path)  # Keeps disk eviction least-recently-used
+            except (OSError, ValueError, KeyError):
+                text = None
+            
+            if text is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, text)
+                return text
+        
+        with self._lock:
+            self.misses += 1
+        return None
+    
+    def put(self, key, text):
+        """
+        Transkripti önbelleğe ekler / Stores a transcript in both tiers
+        """
+        with self._lock:
+            self._remember(key, text)
+        
+        if not self.directory:
+            return
+        
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"text": text}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            
+            with self._lock:
+                if self._disk_bytes is None:
+                    self._disk_bytes = sum(e.stat().st_size for e in os.scandir(self.directory) if e.is_file())
+                else:
+                    self._disk_bytes += os.path.getsize(path)
+                if self._disk_bytes > self.max_bytes:
+                    self._evict_disk()
+        except OSError as e:
+            print(f"Transkript önbelleğe yazılamadı: {e} / Could not write transcript cache")
+    
+    def _remember(self, key, text):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def _evict_disk(self):
+        # Oldest access first; stop once the store is back under its budget
+        entries = sorted((e for e in os.scandir(self.directory) if e.is_file()), key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+    
+    def stats(self):
+        """
+        Önbellek sayaçları / Cache hit and miss counters
+        
+        Returns:
+            dict: memory_hits, disk_hits, misses, memory_entries and hit_rate
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+# Shared by every Transcriptor in the process so repeated clicks and re-uploads hit memory
+TRANSCRIPT_CACHE = TranscriptCache()
 
 class Transcriptor:
-    def __init__(self):
+    def __init__(self, cache=None, backend=None, transcript_directory="transcripts", **backend_options):
         """
         SpeechRecognition kütüphanesini kullanarak yerel ses tanıma gerçekleştiren sınıf
+        
+        Args:
+            cache (TranscriptCache): Kullanılacak önbellek; None ise paylaşılan önbellek, False ise önbellek yok /
+                Cache to use; None for the shared cache, False to disable caching
+            backend (str | RecognizerBackend): Tanıma motoru adı veya nesnesi; varsayılan TRANSCRIPTOR_BACKEND
+                ortam değişkeni veya "google" / Backend name or instance, defaults to $TRANSCRIPTOR_BACKEND or "google"
+            transcript_directory (str): Transkriptlerin saklandığı depo / Artifact store for saved transcripts
+            **backend_options: Motor seçenekleri / Options passed to the backend
         """
+        self.cache = TRANSCRIPT_CACHE if cache is None else (cache or None)
+        self.storage = get_store(transcript_directory)
+        
+        # Bu süreden uzun ses parçalara bölünür / Audio longer than one segment is split (see transcribe_long)
+        self.long_form_segment_seconds = LONG_FORM_SEGMENT_SECONDS
+        self.long_form_overlap_seconds = LONG_FORM_OVERLAP_SECONDS
+        self.long_form_workers = LONG_FORM_WORKERS
         try:
             self.recognizer = sr.Recognizer()
+            backend = backend or os.getenv("TRANSCRIPTOR_BACKEND", "google")
+            if isinstance(backend, RecognizerBackend):
+                self.backend = backend
+            elif backend == "google":
+                self.backend = GoogleBackend(recognizer=self.recognizer, **backend_options)
+            else:
+                self.backend = create_backend(backend, **backend_options)
+            self.backend_name = self.backend.name
             print("Transcriptor başarıyla başlatıldı / Transcriptor initialized successfully")
         except Exception as e:
             print(f"Speech Recognition başlatılırken hata: {e}")
             traceback.print_exc()
             raise
     
-    def transcribe(self, audio_file_path, language="tr-TR"):
+    def transcribe(self, audio, language="tr-TR", sample_rate=None):
         """
-        Ses dosyasını metne dönüştürür / Transcribes the audio file to text
+        Ses dosyasını veya bellekteki sesi metne dönüştürür / Transcribes an audio file or in-memory audio to text
         
         Args:
-            audio_file_path (str): Ses dosyasının yolu / Path to the audio file
+            audio: Ses dosyasının yolu veya bellekteki ses / Path to the audio file, or in-memory
+                audio such as RecordingHandle.audio() (see _as_audio_data)
             language (str): Dil kodu (örn. "tr-TR" Türkçe, "en-US" İngilizce için) / Language code (e.g., "tr-TR" for Turkish, "en-US" for English)
+            sample_rate (int): Bellekteki sesin örnekleme hızı / Sample rate of in-memory audio
             
         Returns:
             str: Dönüştürülen metin / Transcribed text
         """
-        print(f"Ses dosyası transkript edilmeye çalışılıyor: {audio_file_path} / Transcribing audio file: {audio_file_path}")
-        
-        if not os.path.exists(audio_file_path):
-            error_msg = f"Ses dosyası bulunamadı: {audio_file_path} / Audio file not found: {audio_file_path}"
-            print(error_msg)
-            raise FileNotFoundError(error_msg)
-        
         try:
-            with sr.AudioFile(audio_file_path) as source:
-                print("Ses dosyası okunuyor... / Reading audio file...")
-                audio_data = self.recognizer.record(source)
-                
-                print("Google Speech Recognition API ile tanıma yapılıyor... / Recognizing with Google Speech Recognition API...")
-                text = self.recognizer.recognize_google(audio_data, language=language)
-                
-                print(f"Transkript başarılı: {text[:50]}... / Transcription successful")
-                return text
+            audio_data = self._load(audio, sample_rate)
+            text = self._recognize_audio(audio_data, language)
+            print(f"Transkript başarılı: {text[:50]}... / Transcription successful")
+            return text
                 
+        except FileNotFoundError:
+            raise
         except sr.UnknownValueError:
             print("Google Speech Recognition sesi anlayamadı / Could not understand audio")
             return None
@@ -56,6 +551,309 @@ class Transcriptor:
             traceback.print_exc()
             return None
     
+    def _load(self, audio, sample_rate=None):
+        """
+        Dosyayı okur veya bellekteki sesi sarar / Reads a file or wraps in-memory audio as sr.AudioData
+        
+        Raises:
+            FileNotFoundError: Ses dosyası yok / The audio file doesn't exist
+        """
+        if not isinstance(audio, (str, os.PathLike)):
+            audio_data = _as_audio_data(audio, sample_rate)
+            seconds = len(audio_data.frame_data) / audio_data.sample_width / audio_data.sample_rate
+            print(f"Bellekteki ses transkript ediliyor ({seconds:.1f} sn) / Transcribing in-memory audio")
+            return audio_data
+        
+        print(f"Ses dosyası transkript edilmeye çalışılıyor: {audio} / Transcribing audio file: {audio}")
+        if not os.path.exists(audio):
+            error_msg = f"Ses dosyası bulunamadı: {audio} / Audio file not found: {audio}"
+            print(error_msg)
+            raise FileNotFoundError(error_msg)
+        print("Ses dosyası okunuyor... / Reading audio file...")
+        return self._read_audio(audio)
+    
+    def _recognize_file(self, audio_file_path, language):
+        """
+        Dosyayı okuyup tanır, hataları yükseltir / Reads and recognizes a file, raising recognizer errors
+        """
+        print("Ses dosyası okunuyor... / Reading audio file...")
+        return self._recognize_audio(self._read_audio(audio_file_path), language)
+    
+    def _recognize_audio(self, audio_data, language):
+        """
+        Audio longer than `long_form_segment_seconds` is recognized in parallel segments
+        """
+        if self._is_long(audio_data):
+            return self._recognize_long(audio_data, language)["text"]
+        return self._recognize(audio_data, language)
+    
+    def _is_long(self, audio_data):
+        frames = len(audio_data.frame_data) // audio_data.sample_width
+        return frames > self.long_form_segment_seconds * audio_data.sample_rate
+    
+    def transcribe_long(self, audio, language="tr-TR", sample_rate=None):
+        """
+        Uzun sesi zaman damgalı parçalar halinde metne dönüştürür / Transcribes long audio in timestamped segments
+        
+        Args:
+            audio: Ses dosyasının yolu veya bellekteki ses / Path to the audio file or in-memory audio
+            language (str): Dil kodu / Language code
+            sample_rate (int): Bellekteki sesin örnekleme hızı / Sample rate of in-memory audio
+        
+        Returns:
+            dict: "text" (birleştirilmiş metin / stitched transcript) and "segments", a list of
+                {"start", "end", "text", "error"} with times in seconds; None on error
+        """
+        try:
+            audio_data = self._load(audio, sample_rate)
+            return self._recognize_long(audio_data, language)
+        except FileNotFoundError:
+            raise
+        except sr.UnknownValueError:
+            print("Ses anlaşılamadı / Could not understand audio")
+            return None
+        except sr.RequestError as e:
+            print(f"Tanıma servisinden sonuç alınamadı; {e} / Could not request results from service")
+            return None
+        except Exception as e:
+            print(f"Uzun sesi transkript ederken hata: {e} / Error while transcribing long audio")
+            traceback.print_exc()
+            return None
+    
+    def _recognize_segment(self, audio_data, language, retries=2, backoff=0.5):
+        """
+        Bir parçayı tanır, geçici hatalarda yeniden dener / Recognizes one segment, retrying transient errors
+        
+        Returns:
+            tuple: (text, error); text is "" for a segment without speech
+        """
+        for attempt in range(retries + 1):
+            try:
+                return self._recognize(audio_data, language), None
+            except sr.UnknownValueError:
+                return "", None
+            except sr.RequestError as e:
+                if attempt == retries:
+                    return None, f"request_error: {e}"
+                metrics.count("transcriptor_retries_total", backend=self.backend_name)
+                time.sleep(random.uniform(0, backoff * (2 ** attempt)))
+    
+    def _recognize_long(self, audio_data, language):
+        """
+        Sesi örtüşen parçalara bölüp paralel tanır / Splits audio into overlapping segments and recognizes them in parallel
+        
+        Segments are cut at pauses by plan_segments() and sent to the backend
+        concurrently, so the total latency is close to that of the slowest
+        segment. Their texts are joined with stitch_transcripts(). A segment that
+        keeps failing is left out of the text and reported in its "error".
+        
+        Returns:
+            dict: "text" and "segments" as described in transcribe_long()
+        
+        Raises:
+            sr.UnknownValueError: Hiçbir parçada konuşma yok / No segment contained speech
+            sr.RequestError: Hiçbir parça tanınamadı / Every segment failed
+        """
+        rate = audio_data.sample_rate
+        samples = np.frombuffer(audio_data.get_raw_data(convert_width=2), dtype="<i2")
+        bounds = plan_segments(samples, rate, self.long_form_segment_seconds, self.long_form_overlap_seconds)
+        print(f"{len(bounds)} parça tanınıyor... / Recognizing {len(bounds)} segments...")
+        metrics.count("transcriptor_segments_total", len(bounds), backend=self.backend_name)
+        
+        with metrics.span("transcriptor.long_form", backend=self.backend_name), \
+                ThreadPoolExecutor(max_workers=max(1, min(self.long_form_workers, len(bounds)))) as executor:
+            results = list(executor.map(
+                lambda bound: self._recognize_segment(sr.AudioData(samples[bound[0]:bound[1]].tobytes(), rate, 2), language),
+                bounds
+            ))
+        
+        segments = [
+            {"start": round(start / rate, 3), "end": round(stop / rate, 3), "text": text, "error": error}
+            for (start, stop), (text, error) in zip(bounds, results)
+        ]
+        errors = [segment["error"] for segment in segments if segment["error"]]
+        if len(errors) == len(segments):
+            raise sr.RequestError(errors[-1])
+        if errors:
+            print(f"UYARI: {len(errors)} parça tanınamadı / segments could not be recognized")
+        text = stitch_transcripts([segment["text"] for segment in segments])
+        if not text:
+            raise sr.UnknownValueError()
+        return {"text": text, "segments": segments}
+    
+    def _read_audio(self, audio_file_path):
+        """
+        Dosyayı 16-bit mono AudioData olarak okur / Reads a file as 16-bit mono AudioData
+        
+        soundfile FLAC'ı doğrudan okur; sr.AudioFile harici flac programını çalıştırır /
+        soundfile decodes FLAC in-process, sr.AudioFile would shell out to a flac binary
+        """
+        try:
+            with metrics.span("transcriptor.read", reader="soundfile"):
+                samples, sample_rate = sf.read(audio_file_path, dtype="int16", always_2d=True)
+        except RuntimeError:
+            with metrics.span("transcriptor.read", reader="audiofile"), sr.AudioFile(audio_file_path) as source:
+                return self.recognizer.record(source)
+        if samples.shape[1] > 1:
+            samples = samples.mean(axis=1).astype(np.int16)
+        else:
+            samples = samples[:, 0]
+        return sr.AudioData(samples.tobytes(), sample_rate, 2)
+    
+    def _recognize(self, audio_data, language):
+        """
+        Önbelleğe bakarak tanıma yapar / Recognizes audio, consulting the cache first
+        """
+        key = None
+        if self.cache:
+            key = TranscriptCache.key(audio_data, language, self.backend_name)
+            text = self.cache.get(key)
+            metrics.count("transcriptor_cache_total", result="miss" if text is None else "hit")
+            if text is not None:
+                print("Transkript önbellekten alındı / Transcript served from cache")
+                return text
+        
+        print(f"{self.backend_name} ile tanıma yapılıyor... / Recognizing with {self.backend_name}...")
+        metrics.count("transcriptor_audio_bytes_total", len(audio_data.frame_data), backend=self.backend_name)
+        with metrics.span("transcriptor.recognize", backend=self.backend_name):
+            text = self.backend.recognize(audio_data, language)
+        if key:
+            self.cache.put(key, text)
+        return text
+    
+    def _recognize_with_retry(self, audio_file_path, language, retries, backoff):
+        """
+        Geçici servis hatalarında yeniden dener / Retries transient service errors with jittered backoff
+        
+        Returns:
+            dict: Sonuç kaydı / Result record for the manifest
+        """
+        started = time.monotonic()
+        result = {"path": audio_file_path, "language": language, "text": None, "error": None, "attempts": 0}
+        
+        for attempt in range(retries + 1):
+            result["attempts"] = attempt + 1
+            try:
+                result["text"] = self._recognize_file(audio_file_path, language)
+                result["error"] = None
+                break
+            except sr.UnknownValueError:
+                result["error"] = "unknown_value"
+                break
+            except sr.RequestError as e:
+                result["error"] = f"request_error: {e}"
+                if attempt < retries:
+                    metrics.count("transcriptor_retries_total", backend=self.backend_name)
+                    # Full jitter keeps parallel workers from retrying in lockstep
+                    time.sleep(random.uniform(0, backoff * (2 ** attempt)))
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+                break
+        
+        result["elapsed"] = round(time.monotonic() - started, 3)
+        return result
+    
+    def transcribe_many(self, paths, language="tr-TR", max_workers=4, retries=3, backoff=0.5, manifest=None):
+        """
+        Birçok ses dosyasını paralel olarak metne dönüştürür / Transcribes many audio files concurrently
+        
+        Recognition runs on a bounded thread pool; transient sr.RequestError failures
+        are retried with jittered exponential backoff.
+        
+        Args:
+            paths (list): Ses dosyaları veya klasörler / Audio files or directories
+            language (str): Dil kodu / Language code
+            max_workers (int): Eşzamanlı istek sayısı / Number of concurrent requests
+            retries (int): RequestError için yeniden deneme sayısı / Retries for RequestError
+            backoff (float): İlk bekleme süresi (saniye) / Base backoff in seconds
+            manifest (str): Sonuçların ekleneceği JSONL dosyası / JSONL file results are appended to
+            
+        Yields:
+            dict: Tamamlanma sırasına göre sonuçlar / Results in completion order with
+                path, language, text, error, attempts and elapsed keys
+        """
+        files = _expand_audio_paths(paths)
+        manifest_file = None
+        if manifest:
+            os.makedirs(os.path.dirname(manifest) or ".", exist_ok=True)
+            manifest_file = open(manifest, "a", encoding="utf-8")
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(self._recognize_with_retry, path, language, retries, backoff)
+                    for path in files
+                ]
+                for future in as_completed(futures):
+                    result = future.result()
+                    if manifest_file:
+                        manifest_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+                        manifest_file.flush()
+                    yield result
+        finally:
+            if manifest_file:
+                manifest_file.close()
+    
+    def transcribe_stream(self, recorder, language="tr-TR", max_duration=30, silence_ms=1000, callback=None):
+        """
+        Kayıt sürerken parça parça metne dönüştürür / Transcribes speech segments while recording continues
+        
+        Recorder splits the take at short pauses; each segment is recognized as soon
+        as it arrives while capture keeps running in the audio thread.
+        
+        Args:
+            recorder (Recorder): Kayıt için kullanılacak Recorder / Recorder used for capture
+            language (str): Dil kodu / Language code
+            max_duration (float): Maksimum kayıt süresi (saniye, None: sınırsız) / Maximum recording duration in seconds (None: no limit)
+            silence_ms (int): Bu kadar sessizlikten sonra kayıt biter / Stop after this much trailing silence
+            callback: Kayıt dosyası yazıldığında dosya yoluyla çağrılır / Called with the saved file path
+            
+        Yields:
+            str: O ana kadarki transkript / Transcript so far (the last value is final)
+        """
+        segments = queue.Queue()
+        finished = object()
+        
+        def recording_done(filename):
+            if callback:
+                callback(filename)
+            segments.put(finished)
+        
+        if recorder.is_recording():
+            # The take in progress belongs to someone else and would never report to this queue
+            print("Kayıt zaten devam ediyor, akış başlatılamadı / Recorder is busy, cannot stream")
+            return
+        handle = recorder.start_recording(callback=recording_done, silence_ms=silence_ms,
+                                          on_segment=segments.put, max_duration=max_duration)
+        if not handle:
+            return
+        
+        deadline = None if max_duration is None else time.monotonic() + max_duration
+        parts = []
+        while True:
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                segment = segments.get(timeout=timeout)
+            except queue.Empty:
+                # Maximum duration reached: the recorder delivers the rest and then finishes
+                recorder.stop_recording(handle)
+                deadline = None
+                continue
+            
+            if segment is finished:
+                break
+            
+            try:
+                text = self._recognize(_to_audio_data(segment, recorder.sample_rate), language)
+            except sr.UnknownValueError:
+                continue
+            except sr.RequestError as e:
+                print(f"Parça tanınamadı; {e} / Could not recognize segment")
+                continue
+            
+            parts.append(text)
+            yield " ".join(parts)
+    
     def save_transcript(self, text, output_file=None):
         """
         Dönüştürülen metni dosyaya kaydeder / Saves the transcribed text to a file
@@ -72,9 +870,8 @@ class Transcriptor:
             return None
         
         if not output_file:
-            # Timestamp kullanarak dosya adı oluştur / Generate file name with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = f"transcript_{timestamp}.txt"
+            # Depoda zaman damgalı dosya / Timestamped file in the transcript store
+            output_file = self.storage.new_path("transcript", ".txt")
         
         try:
             print(f"Transkript kaydediliyor: {output_file} / Saving transcript: {output_file}")
@@ -89,12 +886,45 @@ class Transcriptor:
             traceback.print_exc()
             return None
 
-# Example usage
-if __name__ == "__main__":
-    try:
-        transcriptor = Transcriptor()
-        
-        # Example audio file path
+def main(argv=None):
+    """
+    Komut satırı girişi / Command line entry point
+    
+    Örnek / Example:
+        python transcriptor.py recordings/ --language tr-TR --workers 8 --manifest transcripts/manifest.jsonl
+    """
+    parser = argparse.ArgumentParser(description="Ses dosyalarını metne dönüştürür / Transcribes audio files")
+    parser.add_argument("paths", nargs="*", help="Ses dosyaları veya klasörler / Audio files or directories")
+    parser.add_argument("--language", default="tr-TR", help="Dil kodu / Language code")
+    parser.add_argument("--workers", type=int, default=4, help="Eşzamanlı istek sayısı / Concurrent requests")
+    parser.add_argument("--retries", type=int, default=3, help="Yeniden deneme sayısı / Retries per file")
+    parser.add_argument("--manifest", default="transcripts/manifest.jsonl", help="JSONL sonuç dosyası / JSONL manifest")
+    parser.add_argument("--backend", default=None, choices=sorted(RECOGNIZER_BACKENDS),
+                        help="Tanıma motoru / Recognizer backend")
+    parser.add_argument("--serve-stub", type=int, metavar="PORT",
+                        help="Stub tanıma sunucusunu başlatır / Runs the stub recognition server")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Stub gecikmesi (sn) / Stub latency")
+    parser.add_argument("--stub-jitter", type=float, default=0.0, help="Stub sapması (sn) / Stub jitter")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="Stub hata oranı / Stub error rate")
+    args = parser.parse_args(argv)
+    
+    stub_options = {"latency": args.stub_latency, "jitter": args.stub_jitter, "error_rate": args.stub_error_rate}
+    if args.serve_stub is not None:
+        server, url = serve_stub(port=args.serve_stub, **stub_options)
+        print(f"Stub tanıma sunucusu: {url} / Stub recognition server running (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+    
+    if args.backend == "stub":
+        transcriptor = Transcriptor(backend="stub", **stub_options)
+    else:
+        transcriptor = Transcriptor(backend=args.backend)
+    
+    if not args.paths:
+        # Example usage
         audio_file = "recordings/audio_sample.wav"
         
         if os.path.exists(audio_file):
@@ -111,6 +941,28 @@ if __name__ == "__main__":
                 transcriptor.save_transcript(text_en, "transcripts/sample_transcript_en.txt")
         else:
             print(f"Ses dosyası bulunamadı: {audio_file} / Audio file not found: {audio_file}")
+        return 0
+    
+    started = time.monotonic()
+    done = failed = 0
+    for result in transcriptor.transcribe_many(args.paths, language=args.language, max_workers=args.workers,
+                                               retries=args.retries, manifest=args.manifest):
+        done += 1
+        if result["error"]:
+            failed += 1
+        print(f"[{done}] {result['path']}: {result['text'] or result['error']}")
+    
+    elapsed = time.monotonic() - started
+    rate = done / elapsed if elapsed else 0.0
+    print(f"{done} dosya, {failed} hata, {elapsed:.1f} sn ({rate:.2f} dosya/sn) / files, errors, seconds")
+    if transcriptor.cache:
+        print(f"Önbellek / Cache: {transcriptor.cache.stats()}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
     except Exception as e:
         print(f"Hata: {e} / Error: {e}")
         traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,54 @@
+"""
+Voice activity detection shared by the recorder and the transcriptor
+
+Only needs numpy, so importing it never opens the audio device libraries.
+"""
+import numpy as np
+
+# Voice activity detection defaults
+VAD_FRAME_MS = 30
+VAD_ENERGY_THRESHOLD_DB = -45.0
+VAD_ZCR_THRESHOLD = 0.25
+
+def _frame_length(sample_rate, frame_ms=VAD_FRAME_MS):
+    return max(1, int(sample_rate * frame_ms / 1000))
+
+def frame_activity(audio, sample_rate, frame_ms=VAD_FRAME_MS,
+                   energy_threshold_db=VAD_ENERGY_THRESHOLD_DB, zcr_threshold=VAD_ZCR_THRESHOLD):
+    """
+    Classify fixed-length frames of audio as speech or silence
+    
+    A frame is speech when its RMS level is above `energy_threshold_db`, or when
+    it is within 6 dB of the threshold and has a high zero-crossing rate (quiet
+    fricatives such as "s" or "f"). Trailing samples that don't fill a whole
+    frame are ignored.
+    
+    Args:
+        audio (np.ndarray): Samples of shape (frames,) or (frames, channels)
+        sample_rate (int): Sample rate of the audio
+        frame_ms (int): Frame length in milliseconds
+        energy_threshold_db (float): RMS level in dBFS above which a frame is speech
+        zcr_threshold (float): Zero crossings per sample that mark a quiet frame as speech
+    
+    Returns:
+        np.ndarray: Boolean array with one entry per frame
+    """
+    audio = np.asarray(audio)
+    if audio.ndim > 1:
+        audio = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1)
+    if np.issubdtype(audio.dtype, np.integer):
+        audio = audio / float(np.iinfo(audio.dtype).max)
+    
+    frame_len = _frame_length(sample_rate, frame_ms)
+    count = len(audio) // frame_len
+    if count == 0:
+        return np.zeros(0, dtype=bool)
+    frames = audio[:count * frame_len].reshape(count, frame_len)
+    
+    power = np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / frame_len
+    energy_db = 10.0 * np.log10(power + 1e-12)
+    zcr = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1) / frame_len
+    
+    return (energy_db > energy_threshold_db) | (
+        (energy_db > energy_threshold_db - 6.0) & (zcr > zcr_threshold)
+    )